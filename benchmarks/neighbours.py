@@ -0,0 +1,74 @@
+"""Compare neighbour access through pypower.direction with the neighbour tables of mines.board
+
+usage: python -m benchmarks.neighbours [--width X] [--height Y] [--mines N] [--repeat R] [--seed S]
+"""
+import argparse, time
+from mines import board
+from pypower import direction
+
+
+def count_flags_by_directions(core, index):
+  """Count the flags around index like the chording of minesweeper.MainScene did"""
+  flaged = 0
+  for d in direction.DIRECTIONS8:
+    if core.is_flaged(index+d):
+      flaged += 1
+  return flaged
+
+
+def neighbours_by_directions(core, index):
+  """List the cells around index like minesweeper.MainScene did"""
+  neighbours = list()
+  for d in direction.DIRECTIONS8:
+    nb = index+d
+    if core.is_vaild(nb):
+      neighbours.append(nb)
+  return neighbours
+
+
+def count_flags_by_table(core, flat):
+  return sum(map(core.flaged.__getitem__, core.neighbours(flat)))
+
+
+def measure(function, cells, repeat):
+  start = time.perf_counter()
+  for _ in range(repeat):
+    for cell in cells:
+      function(cell)
+  return time.perf_counter() - start
+
+
+def run(x, y, n, repeat, seed=0):
+  """Return (name, seconds before, seconds after) for every neighbour-heavy operation"""
+  core = board.BoardCore(x, y, n, seed=seed)
+  core.init((x // 2, y // 2))
+  for flat in range(0, x*y, 3):
+    if core.mines[flat]:
+      core.toggle_flag(core.to_index(flat))
+  indexes = [core.to_index(flat) for flat in range(x*y)]
+  flats = range(x*y)
+
+  results = list()
+  results.append(("count flags", measure(lambda index: count_flags_by_directions(core, index), indexes, repeat),
+                  measure(lambda flat: count_flags_by_table(core, flat), flats, repeat)))
+  results.append(("neighbours", measure(lambda index: neighbours_by_directions(core, index), indexes, repeat),
+                  measure(core.neighbours, flats, repeat)))
+  return results
+
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument("--width", type=int, default=30)
+  parser.add_argument("--height", type=int, default=16)
+  parser.add_argument("--mines", type=int, default=99)
+  parser.add_argument("--repeat", type=int, default=200)
+  parser.add_argument("--seed", type=int, default=0)
+  args = parser.parse_args(argv)
+
+  cells = args.width*args.height*args.repeat
+  for name, before, after in run(args.width, args.height, args.mines, args.repeat, args.seed):
+    print(f"{name}: {before / cells * 1e9:.0f}ns -> {after / cells * 1e9:.0f}ns per cell ({before / after:.1f}x)")
+
+
+if __name__ == "__main__":
+  main()
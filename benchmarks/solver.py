@@ -0,0 +1,58 @@
+"""Play seeded games with mines.solver.Solver and report its speed and quality
+
+usage: python -m benchmarks.solver [--games N] [--width X] [--height Y] [--mines N] [--seed S] [--workers W]
+
+With workers, the frontier components of every board are enumerated on a pool
+of that many processes, which pays off on single huge boards.
+"""
+import argparse, concurrent.futures, time
+from mines import board, solver
+
+
+def run(games, x, y, n, seed=0, executor=None):
+  """Play games seeded seed, seed+1, ... and return (wins, merged SolverStats, seconds)"""
+  stats = solver.SolverStats()
+  wins = 0
+  start = time.perf_counter()
+  for i in range(games):
+    player = solver.Solver(board.BoardCore(x, y, n, seed=seed + i), executor=executor)
+    if player.play():
+      wins += 1
+    stats.merge(player.stats)
+  return wins, stats, time.perf_counter() - start
+
+
+def percentile(values, q):
+  ordered = sorted(values)
+  return ordered[min(len(ordered) - 1, int(q*len(ordered)))]
+
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument("--games", type=int, default=1000)
+  parser.add_argument("--width", type=int, default=30)
+  parser.add_argument("--height", type=int, default=16)
+  parser.add_argument("--mines", type=int, default=99)
+  parser.add_argument("--seed", type=int, default=0)
+  parser.add_argument("--workers", type=int, default=0, help="processes enumerating the components, 0 for none")
+  args = parser.parse_args(argv)
+
+  if args.workers:
+    with concurrent.futures.ProcessPoolExecutor(args.workers) as executor:
+      wins, stats, seconds = run(args.games, args.width, args.height, args.mines, args.seed, executor)
+  else:
+    wins, stats, seconds = run(args.games, args.width, args.height, args.mines, args.seed)
+  latencies = stats.latencies
+  print(f"{args.games} games of {args.width}x{args.height} with {args.mines} mines in {seconds:.2f}s "
+        f"({args.games / seconds:.1f} games/s)")
+  print(f"win rate: {wins / args.games:.3f}")
+  print(f"moves: {stats.moves}, deterministic: {stats.deterministic}, guesses: {stats.guesses}, "
+        f"deterministic ratio: {stats.deterministic_ratio:.3f}")
+  if latencies:
+    print(f"move latency: mean {sum(latencies) / len(latencies) * 1e6:.1f}us, "
+          f"p50 {percentile(latencies, 0.5) * 1e6:.1f}us, p99 {percentile(latencies, 0.99) * 1e6:.1f}us, "
+          f"max {max(latencies) * 1e6:.1f}us")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,225 @@
+"""Time the hot paths of the board and the renderer and compare runs against a baseline
+
+usage: python -m benchmarks.suite run [--out results.json] [--repeat R] [-k PATTERN]
+       python -m benchmarks.suite compare BASELINE.json RESULTS.json [--threshold 0.1]
+
+Rendering benchmarks run under the SDL dummy drivers, so no display is needed.
+compare exits with 1 if the median of any benchmark got slower than the threshold.
+"""
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import argparse, datetime, fnmatch, importlib.util, json, platform, statistics, sys, time
+from mines import board
+
+# name -> (make, number); make() does the setup and returns the function timed, which runs number operations
+BENCHMARKS = dict()
+
+
+def benchmark(name, number=1):
+  def register(make):
+    BENCHMARKS[name] = (make, number)
+    return make
+  return register
+
+
+def _opened_board(x, y, n, seed=0):
+  core = board.BoardCore(x, y, n, seed=seed)
+  core.open((x // 2, y // 2))
+  return core
+
+
+for _density in (0.05, 0.15, 0.3):
+  @benchmark(f"init/100x100-{_density}")
+  def _init(density=_density):
+    core = board.BoardCore(100, 100, int(100*100*density), seed=0)
+    return lambda: core.init((50, 50))
+
+
+@benchmark("open/open-board-1000x1000")
+def _open_open():
+  core = board.BoardCore(1000, 1000, 1000, seed=0)
+  return lambda: core.open((500, 500))
+
+
+@benchmark("open/dense-board-30x16", number=100)
+def _open_dense():
+  cores = [board.BoardCore(30, 16, 170, seed=seed) for seed in range(100)]
+  def run():
+    for core in cores:
+      core.open((15, 8))
+  return run
+
+
+@benchmark("chord/30x16-99")
+def _chord():
+  core = _opened_board(30, 16, 99)
+  for flat in range(30*16):
+    if core.mines[flat]:
+      core.toggle_flag(core.to_index(flat))
+  cells = [core.to_index(flat) for flat in range(30*16) if core.opened[flat] and core.numbers[flat]]
+  def run():
+    for index in cells:
+      core.chord(index)
+  return run
+
+
+@benchmark("probability/30x16-99-game", number=50)
+def _probability_game():
+  from mines import probability
+  core = _opened_board(30, 16, 99)
+  engine = probability.ProbabilityEngine(core)
+  def run():
+    # opens the safest cell 50 times, as long as the game lasts
+    for _ in range(50):
+      flat, _ = engine.safest()
+      if core.game_over or flat is None:
+        break
+      engine.update(core.open(core.to_index(flat)))
+  return run
+
+
+if importlib.util.find_spec("numpy") is not None:  # mines.batch and mines.analysis need it
+  @benchmark("batch/step-4096-30x16-99", number=4096*10)
+  def _batch_step():
+    import numpy as np
+    from mines import batch
+    boards = batch.BatchBoards(4096, 30, 16, 99, seed=0)
+    boards.step(np.zeros(4096, int), np.full(4096, 8*30 + 15))
+    # 10 moves per board on closed safe cells, the ones opened by then being no-ops
+    keys = np.random.default_rng(0).random((4096, 30*16))
+    keys[boards.mines | boards.opened] = 2.0
+    moves = np.argsort(keys, axis=1)[:, :10].T
+    def run():
+      for cells in moves:
+        boards.step(np.zeros(4096, int), cells)
+    return run
+
+  @benchmark("analysis/4096-30x16-99", number=4096)
+  def _analysis():
+    import numpy as np
+    from mines import analysis
+    keys = np.random.default_rng(0).random((4096, 30*16))
+    mines = keys < np.partition(keys, 99, axis=1)[:, 99:100]
+    return lambda: analysis.analyse(mines, 30, 16)
+
+
+def _init_pygame():
+  import pygame
+  if not pygame.display.get_init():
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+  return pygame
+
+
+for _children in (10, 100, 1000):
+  @benchmark(f"render/composite-update-{_children}-dirty")
+  def _composite_update(children=_children):
+    _init_pygame()
+    from pypower import sprite
+    composite = sprite.Composite(0, 0, 1024, 768)
+    texts = [sprite.Text(str(i), ((i*37) % 1000, (i*53) % 740), 20) for i in range(children)]
+    for text in texts:
+      composite.add(text)
+    composite.update()
+    for text in texts:
+      text.dirty = 1
+    return composite.update
+
+
+@benchmark("render/text-construct", number=1000)
+def _text_construct():
+  _init_pygame()
+  from pypower import sprite
+  def run():
+    for i in range(1000):
+      sprite.Text(str(i % 50), (i, i), 30)
+  return run
+
+
+@benchmark("render/text-construct-cold", number=100)
+def _text_construct_cold():
+  _init_pygame()
+  from pypower import sprite
+  def run():
+    sprite.text_cache.clear()
+    for i in range(100):
+      sprite.Text(str(i), (i, i), 30)
+  return run
+
+
+def run(names, repeat=10):
+  """Time every benchmark in names repeat times and return their results by name, in seconds per operation"""
+  results = dict()
+  for name in names:
+    make, number = BENCHMARKS[name]
+    times = list()
+    for _ in range(repeat):
+      function = make()
+      start = time.perf_counter()
+      function()
+      times.append((time.perf_counter() - start) / number)
+    results[name] = {
+      "min": min(times), "median": statistics.median(times), "mean": statistics.fmean(times),
+      "repeat": repeat, "number": number,
+    }
+  return results
+
+
+def compare(baseline, results, threshold=0.1):
+  """Print the change of every benchmark in both runs and return the names slower than threshold"""
+  regressions = list()
+  for name in sorted(set(baseline) & set(results)):
+    before = baseline[name]["median"]
+    after = results[name]["median"]
+    ratio = after / before if before else float("inf")
+    slower = ratio > 1 + threshold
+    if slower:
+      regressions.append(name)
+    print(f"{name:40} {before*1e6:12.2f}us {after*1e6:12.2f}us {ratio:6.2f}x{'  SLOWER' if slower else ''}")
+  for name in sorted(set(baseline) ^ set(results)):
+    print(f"{name:40} only in {'the baseline' if name in baseline else 'the results'}")
+  return regressions
+
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  commands = parser.add_subparsers(dest="command", required=True)
+  run_parser = commands.add_parser("run")
+  run_parser.add_argument("--out", default="-", help="JSON file, - for stdout")
+  run_parser.add_argument("--repeat", type=int, default=10)
+  run_parser.add_argument("-k", dest="pattern", default="*", help="run only the benchmarks matching this glob")
+  compare_parser = commands.add_parser("compare")
+  compare_parser.add_argument("baseline")
+  compare_parser.add_argument("results")
+  compare_parser.add_argument("--threshold", type=float, default=0.1, help="slowdown of the median tolerated")
+  args = parser.parse_args(argv)
+
+  if args.command == "run":
+    names = [name for name in BENCHMARKS if fnmatch.fnmatch(name, args.pattern)]
+    data = {
+      "python": platform.python_version(), "platform": platform.platform(),
+      "date": datetime.datetime.now().isoformat(timespec="seconds"),
+      "results": run(names, args.repeat),
+    }
+    for name, result in data["results"].items():
+      print(f"{name:40} median {result['median']*1e6:12.2f}us  min {result['min']*1e6:12.2f}us", file=sys.stderr)
+    if args.out == "-":
+      json.dump(data, sys.stdout, indent=2)
+      print()
+    else:
+      with open(args.out, "w") as file:
+        json.dump(data, file, indent=2)
+  else:
+    with open(args.baseline) as file:
+      baseline = json.load(file)["results"]
+    with open(args.results) as file:
+      results = json.load(file)["results"]
+    if compare(baseline, results, args.threshold):
+      sys.exit(1)
+
+
+if __name__ == "__main__":
+  main()
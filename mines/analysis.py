@@ -0,0 +1,194 @@
+"""Difficulty metrics of mine layouts, computed for many boards at once with NumPy
+
+usage: python -m mines.analysis CORPUS [--chunk C] [--out rows.csv]
+       python -m mines.analysis --seeds COUNT [--width X] [--height Y] [--mines N] [--seed S] [--out rows.csv]
+
+An opening is a connected region of zero cells, opened by one click with its
+border. An island is a connected group of the numbered cells bordering no
+opening, each of which takes a click of its own. 3BV, the fewest clicks
+clearing a board without chording, is the number of openings plus the number
+of those cells. NumPy is only needed by this module.
+"""
+import argparse, csv, os, sys, time
+import numpy as np
+from . import board
+
+FIELDS = ("board", "width", "height", "mines", "bbbv", "openings", "islands")
+
+
+def analyse(mines, x, y, opened=None):
+  """Return the metrics of B boards of x by y cells as a dict of int arrays of length B
+
+  mines is a bool array of shape (B, x*y). The keys are bbbv, openings and
+  islands, and with the opened cells of every board also solved, the part
+  of the 3BV cleared so far.
+
+  Openings and islands are labelled together, as a cell of one never
+  touches a cell of the other. Every label is the root of a tree of cells:
+  each round the root takes the smallest label next to any of its cells,
+  and labels follow the trees up to their roots, until no root changes.
+  This takes a few rounds for any board.
+  """
+  count = len(mines)
+  width = x + 2
+  padded = width*(y + 2)
+  grid = np.zeros((count, y + 2, width), bool)
+  grid[:, 1:-1, 1:-1] = mines.reshape(count, y, x)
+  inside = np.zeros((y + 2, width), bool)
+  inside[1:-1, 1:-1] = True
+
+  numbers = _block_sum(grid.astype(np.uint8))
+  zero = inside & ~grid & (numbers == 0)
+  isolated = inside & ~grid & ~_block_sum(zero.view(np.uint8)).astype(bool)
+
+  # labels are indexes into the cells of all the boards, and one more past them standing for no label
+  total = count*padded
+  labelled = (zero | isolated).reshape(total)
+  cells = np.arange(total + 1, dtype=np.int64 if total >= 2**31 else np.int32)
+  # a cell starts with the first cell of its run in the row, the padding ending every run
+  starts = labelled.copy()
+  starts[1:] &= ~labelled[:-1]
+  labels = np.maximum.accumulate(np.where(starts, cells[:-1], 0))
+  labels = np.append(np.where(labelled, labels, total), total).astype(cells.dtype)
+  while True:
+    smallest = _block_min(labels[:-1].reshape(count, y + 2, width)).reshape(total)
+    smallest = np.where(labelled, smallest, total)
+    # the label of every cell is its root; a root takes the smallest label next to its cells
+    lower = np.flatnonzero(smallest < labels[:-1])
+    if not len(lower):
+      break
+    np.minimum.at(labels, labels[lower], smallest[lower])
+    while True:
+      jumped = labels[labels]
+      if np.array_equal(jumped, labels):
+        break
+      labels = jumped
+
+  roots = (labels[:-1] == cells[:-1]).reshape(count, padded)
+  zero = zero.reshape(count, padded)
+  isolated = isolated.reshape(count, padded)
+  openings = (roots & zero).sum(1)
+  metrics = {"bbbv": openings + isolated.sum(1), "openings": openings, "islands": (roots & isolated).sum(1)}
+
+  if opened is not None:
+    shown = np.zeros((count, y + 2, width), bool)
+    shown[:, 1:-1, 1:-1] = opened.reshape(count, y, x)
+    shown = shown.reshape(count, padded)
+    # an opening opens whole, so it counts once any of its cells is opened
+    cleared = np.zeros(total + 1, bool)
+    cleared[labels[:-1][(zero & shown).reshape(total)]] = True
+    cleared = cleared[:-1].reshape(count, padded)
+    metrics["solved"] = cleared.sum(1) + (isolated & shown).sum(1)
+  return metrics
+
+
+def board_metrics(core):
+  """Return the metrics of an initialized BoardCore as a dict of ints, solved counting its opened cells"""
+  mines = np.frombuffer(core.mines, np.uint8).astype(bool)[None]
+  opened = np.frombuffer(core.opened, np.uint8).astype(bool)[None]
+  return {key: int(value[0]) for key, value in analyse(mines, core.x, core.y, opened).items()}
+
+
+def _block_sum(grid):
+  """Return the sum of the 3x3 block around every inner cell of padded grids, 0 on the padding"""
+  result = np.zeros_like(grid)
+  line = grid[:, :, :-2] + grid[:, :, 1:-1] + grid[:, :, 2:]
+  result[:, 1:-1, 1:-1] = line[:, :-2] + line[:, 1:-1] + line[:, 2:]
+  return result
+
+
+def _block_min(grid):
+  """Return the minimum of the 3x3 block around every inner cell of padded grids, the padding kept"""
+  result = grid.copy()
+  line = np.minimum(np.minimum(grid[:, :, :-2], grid[:, :, 1:-1]), grid[:, :, 2:])
+  result[:, 1:-1, 1:-1] = np.minimum(np.minimum(line[:, :-2], line[:, 1:-1]), line[:, 2:])
+  return result
+
+
+def read_corpus(path, chunk=4096):
+  """Yield (x, y, ids, mine counts, mine masks) for chunks of the boards of a corpus file
+
+  The file is memory mapped and every chunk is decoded in bulk, which
+  assumes like mines.corpus.Corpus that all its boards have the same size.
+  """
+  if os.path.getsize(path) < board.HEADER.size:
+    return
+  data = np.memmap(path, np.uint8, mode="r")
+  _, x, y, _, _ = board.HEADER.unpack_from(data, 0)
+  size = board.record_size(x, y)
+  records = data[:len(data) // size * size].reshape(-1, size)
+  for start in range(0, len(records), chunk):
+    block = np.array(records[start:start + chunk])
+    if (block[:, :4] != np.frombuffer(board.MAGIC, np.uint8)).any():
+      raise ValueError("Not a corpus of boards of the same size")
+    counts = block[:, 12:16].copy().view("<u4")[:, 0]
+    masks = np.unpackbits(block[:, board.HEADER.size:], axis=1, bitorder="little")[:, :x*y].astype(bool)
+    yield x, y, np.arange(start, start + len(block)), counts, masks
+
+
+def seeded_boards(x, y, n, seeds, chunk=4096, click=None):
+  """Yield chunks like read_corpus for the boards BoardCore makes from seeds, first clicked at click
+
+  The click is the middle cell by default, where mines.solver.Solver starts.
+  """
+  click = click or (x // 2, y // 2)
+  seeds = list(seeds)
+  for start in range(0, len(seeds), chunk):
+    ids = seeds[start:start + chunk]
+    layouts = bytearray()
+    for seed in ids:
+      core = board.BoardCore(x, y, n, seed=seed)
+      core.init(click)
+      layouts += core.mines
+    masks = np.frombuffer(layouts, np.uint8).reshape(len(ids), x*y).astype(bool)
+    yield x, y, np.array(ids), np.full(len(ids), n), masks
+
+
+def score(chunks):
+  """Yield a row of FIELDS for every board of chunks, as they are analysed"""
+  for x, y, ids, counts, masks in chunks:
+    metrics = analyse(masks, x, y)
+    columns = zip(ids.tolist(), counts.tolist(), *(metrics[key].tolist() for key in FIELDS[4:]))
+    for id, n, *values in columns:
+      yield dict(zip(FIELDS, (id, x, y, n, *values)))
+
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument("corpus", nargs="?", help="file written by mines.corpus.write_corpus")
+  parser.add_argument("--seeds", type=int, help="score this many seeded boards instead")
+  parser.add_argument("--width", type=int, default=30)
+  parser.add_argument("--height", type=int, default=16)
+  parser.add_argument("--mines", type=int, default=99)
+  parser.add_argument("--seed", type=int, default=0)
+  parser.add_argument("--chunk", type=int, default=4096, help="boards analysed at once")
+  parser.add_argument("--out", default="-", help="CSV file, - for stdout")
+  args = parser.parse_args(argv)
+  if (args.corpus is None) == (args.seeds is None):
+    parser.error("give either a corpus or --seeds")
+
+  if args.corpus is not None:
+    chunks = read_corpus(args.corpus, args.chunk)
+  else:
+    chunks = seeded_boards(args.width, args.height, args.mines, range(args.seed, args.seed + args.seeds),
+                           args.chunk)
+
+  file = sys.stdout if args.out == "-" else open(args.out, "w", newline="")
+  start = time.perf_counter()
+  boards = 0
+  try:
+    writer = csv.DictWriter(file, FIELDS)
+    writer.writeheader()
+    for row in score(chunks):
+      writer.writerow(row)
+      boards += 1
+  finally:
+    if file is not sys.stdout:
+      file.close()
+
+  seconds = time.perf_counter() - start
+  print(f"{boards} boards in {seconds:.2f}s ({boards / max(seconds, 1e-9):.0f} boards/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,204 @@
+"""Many boards stepped at once with NumPy, for training and evaluating players
+
+NumPy is only needed by this module. Cells are flat indexes y*x + x like in
+mines.board, moves use the op codes of mines.movelog, and observations use
+the state codes of mines.board, so a player sees the same thing as on a
+BoardCore.
+"""
+import numpy as np
+from . import board
+from .movelog import OPEN, CHORD, FLAG
+
+
+class BatchBoards:
+  """B boards of x by y cells with n mines, held as stacked arrays
+
+  mines, opened and flaged are bool arrays and numbers a uint8 array, all of
+  shape (B, x*y). Mines are placed on the first open of a board, outside
+  the 3x3 area around it, like BoardCore.init.
+
+  A step touches only the cells it changes: the observations and the counts
+  of opened safe cells are kept up to date cell by cell, and only the boards
+  where a zero cell is opened get whole arrays, their region grown one ring
+  of cells at a time while it grows.
+  """
+  def __init__(self, boards, x, y, n, seed=None):
+    if n > x*y - 9:
+      raise ValueError("Too Many Mines!")
+
+    self.boards = boards
+    self.x = x
+    self.y = y
+    self.n = n
+    self.rng = np.random.default_rng(seed)
+
+    size = x*y
+    self.mines = np.zeros((boards, size), bool)
+    self.numbers = np.zeros((boards, size), np.uint8)
+    self.opened = np.zeros((boards, size), bool)
+    self.flaged = np.zeros((boards, size), bool)
+    self.initialized = np.zeros(boards, bool)
+    self.lost = np.zeros(boards, bool)
+    self.won = np.zeros(boards, bool)
+    self.safe_opened = np.zeros(boards, np.int64)
+    self._shown = np.zeros((boards, size), np.int8)  # state code of every cell once opened
+    self._observation = np.full((boards, size), board.CLOSED, np.int8)
+
+    # the cells around every cell, padded with the cell itself where there are fewer than 8
+    table = board.neighbour_table(x, y) if size <= board.TABLE_CELLS else \
+      [board._neighbours(flat, x, y) for flat in range(size)]
+    self._around = np.array([cells + (flat,)*(8 - len(cells)) for flat, cells in enumerate(table)], np.int64)
+    self._valid = np.array([[True]*len(cells) + [False]*(8 - len(cells)) for cells in table], bool)
+    column = np.arange(size) % x
+    self._not_first = column != 0  # cells with a neighbour on their left
+    self._not_last = column != x - 1
+
+  @classmethod
+  def from_cores(cls, cores):
+    """Return a batch in the states of initialized BoardCores of the same size"""
+    first = cores[0]
+    batch = cls(len(cores), first.x, first.y, first.n)
+    for i, core in enumerate(cores):
+      batch.mines[i] = np.frombuffer(core.mines, np.uint8)
+      batch.opened[i] = np.frombuffer(core.opened, np.uint8)
+      batch.flaged[i] = np.frombuffer(core.flaged, np.uint8)
+      batch.lost[i] = core.game_over
+    batch.initialized[:] = True
+    batch._analyse(np.arange(len(cores)))
+    batch.safe_opened[:] = (batch.opened & ~batch.mines).sum(1)
+    batch.won = ~batch.lost & (batch.safe_opened == first.x*first.y - first.n)
+    # FLAG is CLOSED + 1
+    closed = batch.flaged.view(np.int8) + np.int8(board.CLOSED)
+    batch._observation[:] = np.where(batch.opened, batch._shown, closed)
+    return batch
+
+  @property
+  def done(self):
+    return self.lost | self.won
+
+  def reset(self, which=None):
+    """Start new games on the boards which, all by default, and return the observations"""
+    which = slice(None) if which is None else which
+    for array in (self.mines, self.opened, self.flaged, self.initialized, self.lost, self.won):
+      array[which] = False
+    self.numbers[which] = 0
+    self.safe_opened[which] = 0
+    self._shown[which] = 0
+    self._observation[which] = board.CLOSED
+    return self.observe()
+
+  def observe(self):
+    """Return the state code of every cell as an int8 array of shape (B, y, x)"""
+    return self._observation.reshape(self.boards, self.y, self.x).copy()
+
+  def step(self, ops, cells):
+    """Apply the move ops[b] on the cell cells[b] of every board b and return (observations, rewards, done)
+
+    Moves on finished boards are ignored. The reward of a board is the share
+    of its safe cells the move opened, so a won game adds up to 1, and -1
+    for opening a mine.
+    """
+    ops = np.asarray(ops)
+    cells = np.asarray(cells, np.int64)
+    rows = np.arange(self.boards)
+    playing = ~self.done
+    opened = self.opened[rows, cells]
+    flaged = self.flaged[rows, cells]
+
+    flag = playing & (ops == FLAG) & ~opened
+    flag_rows, flag_cells = rows[flag], cells[flag]
+    self.flaged[flag_rows, flag_cells] = ~flaged[flag]
+    self._observation[flag_rows, flag_cells] = board.CLOSED + ~flaged[flag]
+
+    opening = playing & (ops == OPEN) & ~opened & ~flaged
+    first = opening & ~self.initialized
+    if first.any():
+      self._place(rows[first], cells[first])
+    seed_rows = [rows[opening]]
+    seed_cells = [cells[opening]]
+
+    # chording opens the closed unflagged cells around a number whose mines are all flagged
+    chord = playing & (ops == CHORD) & opened
+    if chord.any():
+      chord_rows = rows[chord]
+      around = self._around[cells[chord]]
+      valid = self._valid[cells[chord]]
+      flags = (self.flaged[chord_rows[:, None], around] & valid).sum(1)
+      ready = flags == self.numbers[chord_rows, cells[chord]]
+      chord_rows, around, valid = chord_rows[ready], around[ready], valid[ready]
+      valid &= ~self.opened[chord_rows[:, None], around] & ~self.flaged[chord_rows[:, None], around]
+      seed_rows.append(np.broadcast_to(chord_rows[:, None], around.shape)[valid])
+      seed_cells.append(around[valid])
+
+    before = self.safe_opened.copy()
+    self._open(np.concatenate(seed_rows), np.concatenate(seed_cells))
+    rewards = (self.safe_opened - before) / (self.x*self.y - self.n)
+    rewards[playing & self.lost] = -1.0
+    self.won |= ~self.lost & (self.safe_opened == self.x*self.y - self.n)
+    return self.observe(), rewards.astype(np.float32), self.done
+
+  def _open(self, rows, cells):
+    """Open the closed unflagged cells of the boards rows, with the zero regions they are in"""
+    mine = self.mines[rows, cells]
+    self.lost[rows[mine]] = True
+    self.opened[rows, cells] = True
+    self._observation[rows, cells] = self._shown[rows, cells]
+    np.add.at(self.safe_opened, rows[~mine], 1)
+
+    zero = ~mine & (self.numbers[rows, cells] == 0)
+    if not zero.any():
+      return
+
+    # a zero region grows through the unflagged zero cells, and its border is opened with it
+    flooding, position = np.unique(rows[zero], return_inverse=True)
+    region = np.zeros((len(flooding), self.x*self.y), bool)
+    region[position, cells[zero]] = True
+    passable = (self.numbers[flooding] == 0) & ~self.mines[flooding] & ~self.flaged[flooding]
+    growing = np.arange(len(flooding))  # the regions which grew last time
+    while len(growing):
+      new = self._dilate(region[growing]) & passable[growing] & ~region[growing]
+      region[growing] |= new
+      growing = growing[new.any(1)]
+
+    new = (region | self._dilate(region)) & ~self.flaged[flooding] & ~self.opened[flooding]
+    self.opened[flooding] |= new
+    self._observation[flooding] = np.where(new, self._shown[flooding], self._observation[flooding])
+    self.safe_opened[flooding] += new.sum(1)
+
+  def _place(self, rows, cells):
+    # n mines per board at the lowest of random keys, the 3x3 areas around the clicks keyed out of reach
+    keys = self.rng.random((len(rows), self.x*self.y))
+    around = self._around[cells]
+    keys[np.broadcast_to(np.arange(len(rows))[:, None], around.shape)[self._valid[cells]],
+         around[self._valid[cells]]] = 2.0
+    keys[np.arange(len(rows)), cells] = 2.0
+    chosen = np.argpartition(keys, self.n - 1, axis=1)[:, :self.n]
+    self.mines[rows] = False
+    self.mines[rows[:, None], chosen] = True
+    self.initialized[rows] = True
+    self._analyse(rows)
+
+  def _analyse(self, rows):
+    """Count the neighbouring mines of the boards rows"""
+    x, y = self.x, self.y
+    grid = self.mines[rows].reshape(len(rows), y, x).astype(np.uint8)
+    padded = np.pad(grid, ((0, 0), (1, 1), (1, 1)))
+    line = padded[:, :, :-2] + padded[:, :, 1:-1] + padded[:, :, 2:]
+    numbers = (line[:, :-2] + line[:, 1:-1] + line[:, 2:] - grid).reshape(len(rows), -1)
+    self.numbers[rows] = numbers
+    self._shown[rows] = np.where(self.mines[rows], np.int8(board.MINE), numbers.view(np.int8))
+
+  def _dilate(self, cells):
+    """Return the bool array cells of shape (k, x*y) grown by one cell in every direction
+
+    Like count_neighbours in mines.board, a row is shifted by a cell and the
+    columns it wrapped into are masked, then shifted by a row.
+    """
+    x = self.x
+    row = cells.copy()
+    row[:, 1:] |= cells[:, :-1] & self._not_first[1:]
+    row[:, :-1] |= cells[:, 1:] & self._not_last[:-1]
+    block = row.copy()
+    block[:, x:] |= row[:, :-x]
+    block[:, :-x] |= row[:, x:]
+    return block
@@ -0,0 +1,378 @@
+import copy, functools, random, struct
+from . import solver
+
+# translate table mapping every nonzero byte to 1
+_NONZERO = bytes([0] + [1]*255)
+
+# serialized board: magic, width, height, mine count and flat first click
+# followed by the mine mask packed 8 cells per byte, cell 0 in the lowest bit
+HEADER = struct.Struct("<4sIIII")
+MAGIC = b"MSWB"
+NO_CLICK = 0xFFFFFFFF
+
+# state codes of a cell: 0 to 8 are the number of an opened cell
+CLOSED = 9
+FLAG = 10
+MINE = 11
+STATES = 12
+
+# layouts tried by init(no_guess=True) before giving up
+NO_GUESS_TRIES = 10000
+
+# boards up to this many cells share a table of the neighbours of every cell
+TABLE_CELLS = 1 << 16
+_BITCHARS = bytes.maketrans(b"\x00\x01", b"01")
+_BITVALUES = bytes.maketrans(b"01", b"\x00\x01")
+
+
+def count_neighbours(mines, x, y):
+  """Return the number of neighbouring mines of every cell of an x by y mine mask
+
+  The mask is read as a little-endian integer with one byte per cell,
+  so shifting by 8 bits moves a cell one column and by 8*x bits one row.
+  A count never exceeds 8, so the byte digits never carry.
+  """
+  size = x*y
+  mask = int.from_bytes(mines, "little")
+  not_first = int.from_bytes((b"\x00" + b"\xff"*(x-1)) * y, "little")
+  not_last = int.from_bytes((b"\xff"*(x-1) + b"\x00") * y, "little")
+
+  row = mask + ((mask & not_last) << 8) + ((mask & not_first) >> 8)
+  block = row + (row << 8*x) + (row >> 8*x) - mask
+  block &= (1 << 8*size) - 1
+  return block.to_bytes(size, "little")
+
+
+def _neighbours(flat, x, y):
+  cy, cx = divmod(flat, x)
+  left = cx - 1 if cx > 0 else cx
+  right = cx + 2 if cx < x - 1 else cx + 1
+  result = list()
+  for row in range(cy - 1 if cy > 0 else cy, cy + 2 if cy < y - 1 else cy + 1):
+    base = row*x
+    result.extend(nb for nb in range(base + left, base + right) if nb != flat)
+  return tuple(result)
+
+
+@functools.lru_cache(maxsize=8)
+def neighbour_table(x, y):
+  """Return the tuple of the flat indexes around every cell of an x by y board"""
+  return tuple(_neighbours(flat, x, y) for flat in range(x*y))
+
+
+def record_size(x, y):
+  """Return the size in bytes of a serialized x by y board"""
+  return HEADER.size + (x*y + 7) // 8
+
+
+class BoardCore:
+  """Headless board logic
+
+  The state of every cell lives in flat bytearrays indexed by y*x + x,
+  so a board needs a few bytes per cell and no pygame at all.
+  Indexes of the public methods are (x, y) tuples like minesweeper.Board.
+
+  Mines are placed with rng, a random.Random, or with a new one made from
+  seed, so the same seed and first click always give the same board.
+
+  The opened safe cells, the flags and the flags around every cell are
+  counted as moves are made, so won, mines_left and chord never scan cells.
+  """
+  def __init__(self, x, y, n, *, seed=None, rng=None):
+    if n > x*y - 9:
+      raise ValueError("Too Many Mines!")
+
+    self.x = x
+    self.y = y
+    self.n = n
+
+    size = x*y
+    self.mines = bytearray(size)
+    self.numbers = bytearray(size)
+    self.opened = bytearray(size)
+    self.flaged = bytearray(size)
+    self.flaged_around = bytearray(size)  # flagged neighbours of every cell
+    self._blocked = bytearray(size)
+    self.safe_opened = 0
+    self.flags = 0
+
+    self.rng = rng if rng is not None else random.Random(seed)
+    self.first_click = None
+    self._table = neighbour_table(x, y) if size <= TABLE_CELLS else None
+
+    self._initialized = False
+    self.game_over = False
+
+  @property
+  def initialized(self):
+    return self._initialized
+
+  @property
+  def won(self):
+    return not self.game_over and self.safe_opened == len(self.mines) - self.n
+
+  @property
+  def mines_left(self):
+    """Mines not flagged yet, as far as the flags are right"""
+    return self.n - self.flags
+
+  def to_flat(self, index):
+    return index[1]*self.x + index[0]
+
+  def to_index(self, flat):
+    return (flat % self.x, flat // self.x)
+
+  def neighbours(self, flat):
+    """Return the tuple of the flat indexes of the cells around flat"""
+    if self._table is not None:
+      return self._table[flat]
+    return _neighbours(flat, self.x, self.y)
+
+  def is_vaild(self, index):
+    return index[0] >= 0 and index[0] < self.x and index[1] >= 0 and index[1] < self.y
+
+  def is_opened(self, index):
+    if self.is_vaild(index):
+      return bool(self.opened[self.to_flat(index)])
+    else:
+      return False
+
+  def is_flaged(self, index):
+    if self.is_vaild(index):
+      return bool(self.flaged[self.to_flat(index)])
+    else:
+      return False
+
+  def is_mine(self, index):
+    if self.is_vaild(index):
+      return bool(self.mines[self.to_flat(index)])
+    else:
+      return False
+
+  def get_number(self, index):
+    if self.is_vaild(index):
+      return self.numbers[self.to_flat(index)]
+    else:
+      raise IndexError("Invaild Index")
+
+  def get_state(self, flat):
+    """Return the state code of the cell at flat"""
+    if self.opened[flat]:
+      return MINE if self.mines[flat] else self.numbers[flat]
+    return FLAG if self.flaged[flat] else CLOSED
+
+  def toggle_flag(self, index):
+    """Toggle the flag of a closed cell and return whether it has changed"""
+    if self.is_vaild(index) and not self.is_opened(index):
+      flat = self.to_flat(index)
+      self.flaged[flat] ^= 1
+      change = 1 if self.flaged[flat] else -1
+      self.flags += change
+      around = self.flaged_around
+      for nb in self.neighbours(flat):
+        around[nb] += change
+      if self._initialized:
+        self._blocked[flat] = 1 if self.flaged[flat] or self.numbers[flat] or self.mines[flat] else 0
+      return True
+    return False
+
+  def init(self, index, no_guess=False):
+    """Place exactly n mines outside the 3x3 area around index
+
+    The mines are sampled from the flat indexes of the allowed cells,
+    so the time taken does not depend on the density.
+    With no_guess, layouts are drawn until mines.solver.Solver clears one
+    from index without guessing.
+    """
+    self._initialized = True
+    self.first_click = tuple(index)
+
+    cx, cy = index
+    safe = sorted(self.to_flat((i, j)) for j in range(cy-1, cy+2) for i in range(cx-1, cx+2) if self.is_vaild((i, j)))
+
+    for _ in range(NO_GUESS_TRIES if no_guess else 1):
+      placed = bytearray(len(self.mines) - len(safe))
+      for flat in self.rng.sample(range(len(placed)), self.n):
+        placed[flat] = 1
+      for safe_flat in safe:
+        placed.insert(safe_flat, 0)
+      self.mines[:] = placed
+
+      self._update_numbers()
+      self._update_blocked()
+
+      if not no_guess or solver.Solver(self.copy()).solve():
+        return
+    raise RuntimeError("No board without guessing found")
+
+  def copy(self):
+    """Return an unplayed board with the same mines as this initialized board"""
+    return BoardCore.from_bytes(self.to_bytes())
+
+  def clone(self):
+    """Return a copy of the board in its current state, opened and flagged cells included"""
+    board = copy.copy(self)
+    for name in ("mines", "numbers", "opened", "flaged", "flaged_around", "_blocked"):
+      setattr(board, name, bytearray(getattr(self, name)))
+    board.rng = copy.copy(self.rng)
+    return board
+
+  def to_bytes(self):
+    """Serialize the mine layout of an initialized board"""
+    if not self._initialized:
+      raise RuntimeError("Board is not initialized")
+
+    click = NO_CLICK if self.first_click is None else self.to_flat(self.first_click)
+    size = len(self.mines)
+    # reversed so that cell 0 becomes the lowest bit
+    bits = int(self.mines.translate(_BITCHARS)[::-1], 2) if size else 0
+    return HEADER.pack(MAGIC, self.x, self.y, self.n, click) + bits.to_bytes((size + 7) // 8, "little")
+
+  @classmethod
+  def from_bytes(cls, data, offset=0):
+    """Load a board serialized by to_bytes from data at offset
+
+    data may be any buffer, including a mmap, and only the record itself is read.
+    The board is initialized with the stored mines, nothing is generated.
+    """
+    magic, x, y, n, click = HEADER.unpack_from(data, offset)
+    if magic != MAGIC:
+      raise ValueError("Not a serialized board")
+
+    board = cls(x, y, n)
+    size = x*y
+    start = offset + HEADER.size
+    bits = int.from_bytes(data[start:start + (size + 7) // 8], "little")
+    board.mines[:] = format(bits, "b").zfill(size)[::-1].encode().translate(_BITVALUES)[:size]
+    board._initialized = True
+    board.first_click = None if click == NO_CLICK else board.to_index(click)
+    board._update_numbers()
+    board._update_blocked()
+    return board
+
+  def _update_numbers(self):
+    self.numbers[:] = count_neighbours(self.mines, self.x, self.y)
+
+  def _update_blocked(self):
+    # every mask holds only 0 or 1 per byte, so or-ing them as integers is per cell
+    size = len(self.mines)
+    blocked = int.from_bytes(self.numbers.translate(_NONZERO), "little")
+    blocked |= int.from_bytes(self.mines, "little") | int.from_bytes(self.flaged, "little")
+    self._blocked = bytearray(blocked.to_bytes(size, "little"))
+
+  def open(self, index):
+    """Open the cell and return the list of flat indexes newly opened
+
+    A zero cell reveals its whole connected region in one scanline pass
+    over horizontal runs, so no recursion is involved.
+    """
+    if not self.is_vaild(index):
+      return list()
+
+    flat = self.to_flat(index)
+    if self.flaged[flat] or self.opened[flat]:
+      return list()
+
+    if not self._initialized:
+      self.init(index)
+    return self._open(flat)
+
+  def chord(self, index):
+    """Open the cells around an opened cell whose mines are all flagged and return the flat indexes newly opened"""
+    if not self.is_vaild(index):
+      return list()
+
+    flat = self.to_flat(index)
+    if not self.opened[flat]:
+      return list()
+
+    if self.flaged_around[flat] != self.numbers[flat]:
+      return list()
+
+    opened = self.opened
+    flaged = self.flaged
+    result = list()
+    for nb in self.neighbours(flat):
+      if not opened[nb] and not flaged[nb]:
+        result.extend(self._open(nb))
+    return result
+
+  def _open(self, flat):
+    if self.mines[flat]:
+      self.game_over = True
+
+    if self._blocked[flat]:
+      self.opened[flat] = 1
+      self.safe_opened += not self.mines[flat]
+      return [flat]
+
+    # a zero region and its border hold no mine
+    result = list()
+    self._fill(flat, result)
+    self.safe_opened += len(result)
+    return result
+
+  def _fill(self, seed, result):
+    """Open the zero region containing seed and its numbered border
+
+    _blocked marks cells a region can not grow into: numbers, mines, flags
+    and zero cells whose neighbours are already opened.
+    """
+    x = self.x
+    size = len(self._blocked)
+    blocked = self._blocked
+    stack = [seed]
+    while stack:
+      cur = stack.pop()
+      if blocked[cur]:
+        continue
+
+      # Grow the run of zero cells horizontally from cur
+      row_start = cur - cur % x
+      row_end = row_start + x
+      left = blocked.rfind(1, row_start, cur)
+      left = row_start if left < 0 else left + 1
+      right = blocked.find(1, cur, row_end)
+      right = row_end if right < 0 else right
+      blocked[left:right] = b"\x01" * (right - left)
+
+      # Open the run and its border in this row and the rows above and below
+      lo = left - 1 if left > row_start else left
+      hi = right + 1 if right < row_end else right
+      for offset in (-x, 0, x):
+        if 0 <= row_start + offset < size:
+          self._open_span(lo + offset, hi + offset, result, stack)
+
+  def _open_span(self, lo, hi, result, stack):
+    blocked = self._blocked
+    opened = self.opened
+    flaged = self.flaged
+
+    # Queue one seed per zero run that has not been filled yet
+    pos = lo
+    while pos < hi:
+      start = blocked.find(0, pos, hi)
+      if start < 0:
+        break
+      stack.append(start)
+      pos = blocked.find(1, start, hi)
+      if pos < 0:
+        break
+
+    # Open every closed cell unless it is flagged
+    pos = lo
+    while pos < hi:
+      start = opened.find(0, pos, hi)
+      if start < 0:
+        break
+      end = opened.find(1, start, hi)
+      end = hi if end < 0 else end
+      if flaged.find(1, start, end) < 0:
+        opened[start:end] = b"\x01" * (end - start)
+        result.extend(range(start, end))
+      else:
+        for flat in range(start, end):
+          if not flaged[flat]:
+            opened[flat] = 1
+            result.append(flat)
+      pos = end
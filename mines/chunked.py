@@ -0,0 +1,290 @@
+import collections, os, random, zlib
+from . import board
+
+# width and height of a chunk in cells
+CHUNK = 64
+
+
+class Chunk:
+  """Cells of a CHUNK by CHUNK square, indexed by y*CHUNK + x inside the chunk"""
+  __slots__ = ("mines", "numbers", "opened", "flaged")
+
+  def __init__(self):
+    size = CHUNK*CHUNK
+    self.mines = None  # generated on first use
+    self.numbers = None  # counted on first use, needs the mines of the chunks around
+    self.opened = bytearray(size)
+    self.flaged = bytearray(size)
+
+  @property
+  def played(self):
+    return self.opened.find(1) >= 0 or self.flaged.find(1) >= 0
+
+
+class ChunkedBoard:
+  """Huge board generated a chunk at a time
+
+  The mines of a chunk are drawn, density of its cells, from a random.Random
+  seeded with the board seed and the chunk coordinates once the first click
+  is known, so chunks nobody looked at cost nothing and a dropped chunk can be
+  drawn again. Up to max_chunks chunks stay in memory; beyond that the least
+  recently used ones are dropped, keeping only their opened and flagged cells,
+  compressed, in memory or in a file of cache_dir. Reads trim the chunks
+  before they load any, and moves after, so beyond max_chunks only the
+  chunks one read or one move needs are loaded. A zero region opens
+  max_fill cells at a time, the rest being opened by fill, so a click on a
+  region spreading over the whole board neither stalls nor loads every chunk.
+  Indexes are (x, y) tuples like BoardCore.
+  """
+  def __init__(self, x, y, density, *, seed=None, max_chunks=256, cache_dir=None, max_fill=1024):
+    if not 0 <= density < 1:
+      raise ValueError("density must be in [0, 1)")
+
+    self.x = x
+    self.y = y
+    self.density = density
+    self.seed = seed if seed is not None else random.randrange(2**63)
+    self.max_chunks = max_chunks
+    self.cache_dir = cache_dir
+    self.max_fill = max_fill
+
+    self.first_click = None
+    self.game_over = False
+
+    self._chunks = collections.OrderedDict()  # (cx, cy) -> Chunk
+    self._cold = dict()  # (cx, cy) -> compressed opened and flaged cells, None if in a file
+    self._pending = collections.deque()  # opened zero cells whose neighbours are still to open
+
+  @property
+  def initialized(self):
+    return self.first_click is not None
+
+  @property
+  def filling(self):
+    """Whether a zero region is still being opened by fill"""
+    return bool(self._pending)
+
+  @property
+  def loaded_chunks(self):
+    return len(self._chunks)
+
+  @property
+  def cold_chunks(self):
+    return len(self._cold)
+
+  def has_chunk(self, key):
+    """Return whether the chunk at key was made, so it may hold opened or flagged cells"""
+    return key in self._chunks or key in self._cold
+
+  def is_vaild(self, index):
+    return index[0] >= 0 and index[0] < self.x and index[1] >= 0 and index[1] < self.y
+
+  def _path(self, key):
+    return os.path.join(self.cache_dir, "chunk-{}-{}.z".format(*key))
+
+  def _find(self, key):
+    """Return the chunk at key if it was ever played on, without making one"""
+    if key in self._chunks:
+      return self._chunk(key)
+    if key in self._cold:
+      self.trim()
+      return self._chunk(key)
+    return None
+
+  def _chunk(self, key):
+    chunk = self._chunks.get(key)
+    if chunk is not None:
+      self._chunks.move_to_end(key)
+      return chunk
+
+    chunk = Chunk()
+    if key in self._cold:
+      data = self._cold.pop(key)
+      if data is None:
+        with open(self._path(key), "rb") as file:
+          data = file.read()
+        os.remove(self._path(key))
+      data = zlib.decompress(data)
+      chunk.opened[:] = data[:CHUNK*CHUNK]
+      chunk.flaged[:] = data[CHUNK*CHUNK:]
+    self._chunks[key] = chunk
+    return chunk
+
+  def trim(self):
+    """Drop the least recently used chunks beyond max_chunks"""
+    while len(self._chunks) > self.max_chunks:
+      key, chunk = self._chunks.popitem(last=False)
+      if not chunk.played:
+        continue
+      data = zlib.compress(bytes(chunk.opened + chunk.flaged))
+      if self.cache_dir is None:
+        self._cold[key] = data
+      else:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(self._path(key), "wb") as file:
+          file.write(data)
+        self._cold[key] = None
+
+  def _mines(self, key):
+    chunk = self._chunk(key)
+    if chunk.mines is not None:
+      return chunk.mines
+
+    mines = chunk.mines = bytearray(CHUNK*CHUNK)
+    left = key[0]*CHUNK
+    top = key[1]*CHUNK
+    width = max(0, min(CHUNK, self.x - left)) if left >= 0 else 0
+    height = max(0, min(CHUNK, self.y - top)) if top >= 0 else 0
+    cells = [j*CHUNK + i for j in range(height) for i in range(width)]
+    rng = random.Random(f"{self.seed}:{key[0]}:{key[1]}")
+    for flat in rng.sample(cells, round(self.density*len(cells))):
+      mines[flat] = 1
+
+    # the 3x3 area of the first click is kept clear
+    fx, fy = self.first_click
+    for j in range(fy-1, fy+2):
+      for i in range(fx-1, fx+2):
+        if 0 <= i - left < CHUNK and 0 <= j - top < CHUNK:
+          mines[(j - top)*CHUNK + i - left] = 0
+    return mines
+
+  def _ready(self, key):
+    """Return the chunk at key with its mines and numbers"""
+    chunk = self._chunk(key)
+    if chunk.numbers is not None:
+      return chunk
+
+    # lay the chunk and a ring of cells of the chunks around into one mask, no mines past the board
+    size = CHUNK + 2
+    padded = bytearray(size*size)
+    cx, cy = key
+    columns = -(-self.x // CHUNK)
+    rows = -(-self.y // CHUNK)
+    for dy in (-1, 0, 1):
+      for dx in (-1, 0, 1):
+        if not (0 <= cx + dx < columns and 0 <= cy + dy < rows):
+          continue
+        mines = self._mines((cx+dx, cy+dy))
+        for j in range(CHUNK):
+          row = j + CHUNK*dy + 1
+          if 0 <= row < size:
+            start = max(0, -(CHUNK*dx + 1))
+            end = min(CHUNK, size - (CHUNK*dx + 1))
+            if start < end:
+              dest = row*size + CHUNK*dx + 1
+              padded[dest + start:dest + end] = mines[j*CHUNK + start:j*CHUNK + end]
+
+    counts = board.count_neighbours(padded, size, size)
+    chunk.numbers = bytearray(b"".join(counts[(j+1)*size + 1:(j+1)*size + 1 + CHUNK] for j in range(CHUNK)))
+    self._chunks.move_to_end(key)  # kept over the chunks around, only needed for the numbers
+    return chunk
+
+  def _cell(self, index):
+    """Return the ready chunk holding index and the position in it"""
+    chunk = self._ready((index[0] // CHUNK, index[1] // CHUNK))
+    return chunk, (index[1] % CHUNK)*CHUNK + index[0] % CHUNK
+
+  def is_opened(self, index):
+    if not self.is_vaild(index):
+      return False
+    chunk = self._find((index[0] // CHUNK, index[1] // CHUNK))
+    return chunk is not None and bool(chunk.opened[(index[1] % CHUNK)*CHUNK + index[0] % CHUNK])
+
+  def is_flaged(self, index):
+    if not self.is_vaild(index):
+      return False
+    chunk = self._find((index[0] // CHUNK, index[1] // CHUNK))
+    return chunk is not None and bool(chunk.flaged[(index[1] % CHUNK)*CHUNK + index[0] % CHUNK])
+
+  def is_mine(self, index):
+    if not self.is_vaild(index) or not self.initialized:
+      return False
+    self.trim()
+    chunk, flat = self._cell(index)
+    return bool(chunk.mines[flat])
+
+  def get_number(self, index):
+    if not self.is_vaild(index):
+      raise IndexError("Invaild Index")
+    if not self.initialized:
+      return 0
+    self.trim()
+    chunk, flat = self._cell(index)
+    return chunk.numbers[flat]
+
+  def get_state(self, index):
+    """Return the state code of the cell at index, see mines.board"""
+    chunk = self._find((index[0] // CHUNK, index[1] // CHUNK))
+    if chunk is None:
+      return board.CLOSED
+    flat = (index[1] % CHUNK)*CHUNK + index[0] % CHUNK
+    if chunk.opened[flat]:
+      self.trim()
+      chunk = self._ready((index[0] // CHUNK, index[1] // CHUNK))
+      return board.MINE if chunk.mines[flat] else chunk.numbers[flat]
+    return board.FLAG if chunk.flaged[flat] else board.CLOSED
+
+  def toggle_flag(self, index):
+    """Toggle the flag of a closed cell and return whether it has changed"""
+    if not self.is_vaild(index) or self.is_opened(index):
+      return False
+    chunk = self._chunk((index[0] // CHUNK, index[1] // CHUNK))
+    chunk.flaged[(index[1] % CHUNK)*CHUNK + index[0] % CHUNK] ^= 1
+    self.trim()
+    return True
+
+  def open(self, index):
+    """Open the cell and return the list of indexes newly opened"""
+    if not self.is_vaild(index) or self.is_flaged(index) or self.is_opened(index):
+      return list()
+
+    if not self.initialized:
+      self.first_click = tuple(index)
+
+    chunk, flat = self._cell(index)
+    chunk.opened[flat] = 1
+    result = [tuple(index)]
+    if chunk.mines[flat]:
+      self.game_over = True
+      return result
+
+    if chunk.numbers[flat] == 0:
+      self._pending.append(tuple(index))
+    result.extend(self.fill())
+    return result
+
+  def fill(self, limit=None):
+    """Open about limit more cells, max_fill by default, of the zero regions being opened and return their indexes"""
+    limit = self.max_fill if limit is None else limit
+    queue = self._pending
+    result = list()
+    while queue and len(result) < limit:
+      cx, cy = queue.popleft()
+      for ny in range(cy-1, cy+2):
+        for nx in range(cx-1, cx+2):
+          if not (0 <= nx < self.x and 0 <= ny < self.y):
+            continue
+          chunk, flat = self._cell((nx, ny))
+          if not chunk.opened[flat] and not chunk.flaged[flat]:
+            chunk.opened[flat] = 1
+            result.append((nx, ny))
+            if chunk.numbers[flat] == 0:
+              queue.append((nx, ny))
+
+    self.trim()
+    return result
+
+  def chord(self, index):
+    """Open the cells around an opened cell whose mines are all flagged and return the indexes newly opened"""
+    if not self.is_opened(index):
+      return list()
+
+    around = [(index[0]+dx, index[1]+dy) for dy in (-1, 0, 1) for dx in (-1, 0, 1)
+              if (dx or dy) and self.is_vaild((index[0]+dx, index[1]+dy))]
+    if sum(self.is_flaged(nb) for nb in around) != self.get_number(index):
+      return list()
+
+    result = list()
+    for nb in around:
+      result.extend(self.open(nb))
+    return result
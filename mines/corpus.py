@@ -0,0 +1,64 @@
+import mmap
+from . import board
+
+
+def write_corpus(path, boards):
+  """Write initialized boards to path one record after another"""
+  with open(path, "wb") as file:
+    for core in boards:
+      file.write(core.to_bytes())
+
+
+class Corpus:
+  """Memory mapped file of boards written by write_corpus
+
+  Nothing is parsed up front; a record is decoded only when its board is requested.
+  Indexing assumes every record has the size of the first one,
+  which holds for a corpus of boards with the same width and height.
+  """
+  def __init__(self, path):
+    self._file = open(path, "rb")
+    try:
+      self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:  # an empty file can not be mapped
+      self._map = b""
+
+    self._record_size = None
+    if len(self._map) >= board.HEADER.size:
+      _, x, y, _, _ = board.HEADER.unpack_from(self._map, 0)
+      self._record_size = board.record_size(x, y)
+
+  def close(self):
+    if isinstance(self._map, mmap.mmap):
+      self._map.close()
+    self._file.close()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc_info):
+    self.close()
+
+  def __len__(self):
+    if self._record_size is None:
+      return 0
+    return len(self._map) // self._record_size
+
+  def __getitem__(self, i):
+    if i < 0:
+      i += len(self)
+    if not 0 <= i < len(self):
+      raise IndexError("Corpus index out of range")
+    return board.BoardCore.from_bytes(self._map, i*self._record_size)
+
+  def offsets(self):
+    """Yield the offset of every record, following the headers"""
+    offset = 0
+    while offset + board.HEADER.size <= len(self._map):
+      yield offset
+      _, x, y, _, _ = board.HEADER.unpack_from(self._map, offset)
+      offset += board.record_size(x, y)
+
+  def __iter__(self):
+    for offset in self.offsets():
+      yield board.BoardCore.from_bytes(self._map, offset)
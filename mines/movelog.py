@@ -0,0 +1,156 @@
+"""Append-only logs of the moves of games, replayed on the headless board
+
+usage: python -m mines.movelog PATH  (replays every game in PATH and reports the speed)
+"""
+import bisect, struct, sys, time
+from . import board
+
+# a log: magic, width, height, mine count, seed, whether a board follows, move count,
+# then the board serialized by BoardCore.to_bytes if the game did not start from the seed,
+# then a record per move: op, flat index and frame
+HEADER = struct.Struct("<4sIIIQ?I")
+MAGIC = b"MSWL"
+MOVE = struct.Struct("<BII")
+
+OPEN = 0
+CHORD = 1
+FLAG = 2
+
+
+def apply(core, op, flat):
+  """Apply a move to core and return the flat indexes it opened"""
+  index = core.to_index(flat)
+  if op == OPEN:
+    return core.open(index)
+  elif op == CHORD:
+    return core.chord(index)
+  elif op == FLAG:
+    core.toggle_flag(index)
+    return list()
+  raise ValueError(f"Unknown move {op}")
+
+
+class MoveLog:
+  """Moves of a game on a board made from seed, or on a given initialized board"""
+  def __init__(self, x, y, n, seed=0, *, core=None):
+    self.x = x
+    self.y = y
+    self.n = n
+    self.seed = seed
+    self.board = core.to_bytes() if core is not None else None
+    self._moves = bytearray()
+
+  def new_board(self):
+    """Return the board the game started on, with no move played"""
+    if self.board is not None:
+      return board.BoardCore.from_bytes(self.board)
+    return board.BoardCore(self.x, self.y, self.n, seed=self.seed)
+
+  def append(self, op, flat, frame=0):
+    self._moves += MOVE.pack(op, flat, frame)
+
+  def __len__(self):
+    return len(self._moves) // MOVE.size
+
+  def __getitem__(self, i):
+    """Return the move i as (op, flat, frame)"""
+    if i < 0:
+      i += len(self)
+    if not 0 <= i < len(self):
+      raise IndexError("move index out of range")
+    return MOVE.unpack_from(self._moves, i*MOVE.size)
+
+  def moves(self, start=0, stop=None):
+    """Iterate over the moves from start to stop as (op, flat, frame)"""
+    stop = len(self) if stop is None else min(stop, len(self))
+    return MOVE.iter_unpack(memoryview(self._moves)[start*MOVE.size:stop*MOVE.size])
+
+  def to_bytes(self):
+    data = HEADER.pack(MAGIC, self.x, self.y, self.n, self.seed, self.board is not None, len(self))
+    return data + (self.board or b"") + self._moves
+
+  @classmethod
+  def from_bytes(cls, data, offset=0):
+    """Load a log serialized by to_bytes from data at offset and return it with the offset after it"""
+    magic, x, y, n, seed, has_board, count = HEADER.unpack_from(data, offset)
+    if magic != MAGIC:
+      raise ValueError("Not a move log")
+
+    log = cls(x, y, n, seed)
+    offset += HEADER.size
+    if has_board:
+      size = board.record_size(x, y)
+      log.board = bytes(data[offset:offset + size])
+      offset += size
+    log._moves = bytearray(data[offset:offset + count*MOVE.size])
+    return log, offset + count*MOVE.size
+
+
+def write_logs(path, logs):
+  """Append logs to the file at path"""
+  with open(path, "ab") as file:
+    for log in logs:
+      file.write(log.to_bytes())
+
+
+def read_logs(path):
+  """Iterate over the logs in the file at path"""
+  with open(path, "rb") as file:
+    data = file.read()
+  offset = 0
+  while offset < len(data):
+    log, offset = MoveLog.from_bytes(data, offset)
+    yield log
+
+
+class Replay:
+  """Board states of a logged game, seekable to any move
+
+  A copy of the board is kept every snapshot_every moves as they are first
+  replayed, so seeking costs at most snapshot_every moves from the nearest one.
+  """
+  def __init__(self, log, snapshot_every=64):
+    self.log = log
+    self.snapshot_every = snapshot_every
+    self._positions = [0]  # move counts of the snapshots, ascending
+    self._snapshots = [log.new_board()]
+
+  def seek(self, position):
+    """Return a new board with the first position moves applied"""
+    position = max(0, min(position, len(self.log)))
+    i = bisect.bisect_right(self._positions, position) - 1
+    current = self._positions[i]
+    core = self._snapshots[i].clone()
+    for op, flat, _ in self.log.moves(current, position):
+      apply(core, op, flat)
+      current += 1
+      if current % self.snapshot_every == 0 and current > self._positions[-1]:
+        self._positions.append(current)
+        self._snapshots.append(core.clone())
+    return core
+
+  def final(self):
+    """Return the board after every move"""
+    return self.seek(len(self.log))
+
+
+def replay(log):
+  """Apply every move of log to a new board and return it, keeping no snapshot"""
+  core = log.new_board()
+  for op, flat, _ in log.moves():
+    apply(core, op, flat)
+  return core
+
+
+if __name__ == "__main__":
+  if len(sys.argv) != 2:
+    sys.exit(__doc__.splitlines()[2])
+  games = moves = lost = 0
+  start = time.perf_counter()
+  for log in read_logs(sys.argv[1]):
+    core = replay(log)
+    games += 1
+    moves += len(log)
+    lost += core.game_over
+  seconds = time.perf_counter() - start
+  print(f"{games} games, {moves} moves, {lost} lost, replayed in {seconds:.2f}s ({games / max(seconds, 1e-9):.0f} games/s)")
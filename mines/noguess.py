@@ -0,0 +1,89 @@
+"""Pools of boards which can be cleared without guessing
+
+usage: python -m mines.noguess X Y N COUNT  (fills the cache on disk up to COUNT boards)
+"""
+import collections, os, random, sys
+from pypower import directory
+from . import board, corpus
+
+
+class BoardPool:
+  """Pre-generated no guess boards per (x, y, n)
+
+  Each board is initialized from a random first click, kept in first_click,
+  so a game can start by opening it. Up to max_keys pools stay in memory;
+  the least recently used one is appended to its file in cache_dir when
+  another is needed, and files are read back when their pool is used again.
+  """
+  def __init__(self, cache_dir=directory.cache_dir, max_keys=4):
+    self.cache_dir = cache_dir
+    self.max_keys = max_keys
+    self.hits = 0
+    self.misses = 0
+    self._pools = collections.OrderedDict()  # (x, y, n) -> deque of BoardCore
+
+  def _path(self, key):
+    return os.path.join(self.cache_dir, "noguess-{}x{}-{}.bin".format(*key))
+
+  def _get(self, key):
+    if key in self._pools:
+      self._pools.move_to_end(key)
+      return self._pools[key]
+
+    boards = collections.deque()
+    if self.cache_dir is not None and os.path.exists(self._path(key)):
+      with corpus.Corpus(self._path(key)) as stored:
+        boards.extend(stored)
+      os.remove(self._path(key))
+
+    self._pools[key] = boards
+    while len(self._pools) > self.max_keys:
+      self._store(*self._pools.popitem(last=False))
+    return boards
+
+  def _store(self, key, boards):
+    if self.cache_dir is None or not boards:
+      return
+    os.makedirs(self.cache_dir, exist_ok=True)
+    with open(self._path(key), "ab") as file:
+      for core in boards:
+        file.write(core.to_bytes())
+
+  def __len__(self):
+    return sum(len(boards) for boards in self._pools.values())
+
+  def generate(self, x, y, n, rng=None):
+    """Return a new no guess board without touching the pool"""
+    rng = rng if rng is not None else random.Random()
+    core = board.BoardCore(x, y, n, rng=rng)
+    core.init((rng.randrange(x), rng.randrange(y)), no_guess=True)
+    return core
+
+  def fill(self, x, y, n, count, rng=None):
+    """Generate boards until the pool of (x, y, n) holds count of them"""
+    boards = self._get((x, y, n))
+    while len(boards) < count:
+      boards.append(self.generate(x, y, n, rng))
+
+  def take(self, x, y, n, rng=None):
+    """Return a no guess board, generating one only if the pool is empty"""
+    boards = self._get((x, y, n))
+    if boards:
+      self.hits += 1
+      return boards.popleft()
+    self.misses += 1
+    return self.generate(x, y, n, rng)
+
+  def save(self):
+    """Write every pool in memory to cache_dir"""
+    while self._pools:
+      self._store(*self._pools.popitem(last=False))
+
+
+if __name__ == "__main__":
+  if len(sys.argv) != 5:
+    sys.exit(__doc__.splitlines()[2])
+  x, y, n, count = map(int, sys.argv[1:])
+  pool = BoardPool()
+  pool.fill(x, y, n, count)
+  pool.save()
@@ -0,0 +1,387 @@
+import collections, math, operator
+
+
+def _pack(coefficients, size):
+  """Return a polynomial packed in an int, a coefficient every size bytes"""
+  return int.from_bytes(b"".join(c.to_bytes(size, "little") for c in coefficients), "little")
+
+
+def _unpack(packed, size, count, start=0):
+  """Return count coefficients from start of a polynomial packed by _pack"""
+  packed = (packed >> 8*size*start) & ((1 << 8*size*count) - 1)
+  data = packed.to_bytes(size*count, "little")
+  return [int.from_bytes(data[k*size:(k + 1)*size], "little") for k in range(count)]
+
+
+def _times(a, b):
+  """Return the product of the polynomials a and b, lists of coefficients"""
+  result = [0]*(len(a) + len(b) - 1)
+  for i, x in enumerate(a):
+    for j, y in enumerate(b):
+      result[i + j] += x*y
+  return result
+
+
+def _over(a, b):
+  """Return the polynomial a divided by b, which divides it exactly"""
+  rest = list(a)
+  result = [0]*(len(a) - len(b) + 1)
+  for i in range(len(result) - 1, -1, -1):
+    result[i] = rest[i + len(b) - 1] // b[-1]
+    for j, y in enumerate(b):
+      rest[i + j] -= result[i]*y
+  return result
+
+
+def _binomials(n, top, count):
+  """Return [C(n, top), C(n, top - 1), ...], count of them"""
+  result = [0]*count
+  r = min(top, n)
+  if r < 0:
+    return result
+  ways = math.comb(n, r)
+  for k in range(top - r, count):
+    result[k] = ways
+    if not r:
+      break
+    ways = ways*r // (n - r + 1)
+    r -= 1
+  return result
+
+
+class Component:
+  """Solutions of a set of constraints sharing cells, counted by their number of mines
+
+  totals[k] is the number of solutions with fewest + k mines and
+  marginals[cell][k] the number of those with a mine on cell. They are
+  counted by dynamic programming over the cells in order, the state being
+  what is still needed by the constraints some but not all of whose cells
+  are assigned, forwards for the totals and backwards for the marginals.
+  """
+  def __init__(self, constraints):
+    # order the cells so the cells of a constraint come close together
+    cells = list()
+    seen = set()
+    for group, _ in sorted(constraints, key=lambda constraint: min(constraint[0])):
+      for cell in group:
+        if cell not in seen:
+          seen.add(cell)
+          cells.append(cell)
+    self.cells = cells
+    position = {cell: i for i, cell in enumerate(cells)}
+
+    # the constraints of every cell, with how many of their cells come after it
+    touching = [list() for _ in cells]
+    for j, (group, _) in enumerate(constraints):
+      positions = sorted(position[cell] for cell in group)
+      for k, i in enumerate(positions):
+        touching[i].append((j, len(positions) - 1 - k))
+
+    def step(i, state, value):
+      """Return the state after giving cells[i] value, or None if a constraint breaks"""
+      needed = dict(state)
+      for j, after in touching[i]:
+        left = (needed[j] if j in needed else constraints[j][1]) - value
+        if left < 0 or left > after:
+          return None
+        if after:
+          needed[j] = left
+        else:
+          needed.pop(j, None)
+      return tuple(sorted(needed.items()))
+
+    # polynomials in the mines are packed in ints by _pack, so adding them is adding
+    # ints and multiplying them is multiplying ints; a coefficient counts assignments
+    # of some of the cells so it is less than 2**(len(cells) + 1)
+    size = len(cells) // 8 + 1
+    bits = 8*size
+
+    # forwards: the solutions of the cells before i per state, and the states following each
+    forward = [{(): 1}]
+    transitions = list()
+    for i in range(len(cells)):
+      states = dict()
+      following = dict()
+      for state, ways in forward[-1].items():
+        after = following[state] = (step(i, state, 0), step(i, state, 1))
+        if after[0] is not None:
+          states[after[0]] = states.get(after[0], 0) + ways
+        if after[1] is not None:
+          states[after[1]] = states.get(after[1], 0) + (ways << bits)
+      forward.append(states)
+      transitions.append(following)
+    packed = forward[-1].get((), 0)
+    # only the mine counts from fewest to most have solutions
+    self.fewest = ((packed & -packed).bit_length() - 1) // bits if packed else 0
+    count = (packed.bit_length() - 1) // bits + 1 - self.fewest if packed else 1
+    self.totals = _unpack(packed, size, count, self.fewest)
+
+    # backwards: the solutions of the cells from i on per state
+    backward = {(): 1}
+    self.marginals = dict()
+    for i in range(len(cells) - 1, -1, -1):
+      states = dict()
+      mined = 0
+      for state, ways in forward[i].items():
+        total = 0
+        for value, following in enumerate(transitions[i][state]):
+          if following is None or following not in backward:
+            continue
+          if value:
+            rest = backward[following] << bits
+            mined += ways*rest
+          else:
+            rest = backward[following]
+          total += rest
+        if total:
+          states[state] = total
+      backward = states
+      self.marginals[cells[i]] = _unpack(mined, size, count, self.fewest)
+
+
+class ProbabilityEngine:
+  """Exact mine probability of every closed cell of a BoardCore
+
+  Only opened cells constrain the mines; flags are the player's guesses and
+  are not trusted. The constraints of the opened numbers are kept up to date
+  from the cells each move opened. Cells a constraint decides alone, with
+  no mine or only mines left, are taken out as they are found, following
+  only the constraints next to them. The rest is split into components
+  sharing cells; each component is counted once and cached by its
+  constraints. The split is kept between moves and only the components a
+  move touched are split again, and the solutions of the whole frontier per
+  mine count are kept as their product, the old components divided out and
+  the new ones multiplied in. Components are weighted together by the ways
+  to place the other mines on the closed cells no constraint touches, with
+  exact integers, over the mine counts the frontier can hold.
+  Given an executor, like a concurrent.futures.ProcessPoolExecutor, the
+  components of at least min_parallel cells are counted by its workers.
+  """
+  def __init__(self, core, max_cache=1024, *, executor=None, min_parallel=24):
+    self.core = core
+    self.max_cache = max_cache
+    self.executor = executor
+    self.min_parallel = min_parallel  # smaller components are not worth sending to a worker
+    self.hits = 0
+    self.misses = 0
+
+    self._constraints = dict()  # opened number -> (closed neighbours, mines among them)
+    self._live = dict()  # opened number -> its constraint on the undecided cells, if it decides none alone
+    self._mines = set()  # closed cells decided to be mines
+    self._safe = set()  # closed cells decided to be safe
+    self._cache = collections.OrderedDict()  # frozenset of constraints -> Component
+    self._changed = set()  # opened numbers whose live constraint changed since the last split
+    self._parts = dict()  # frozenset of constraints -> (Component, opened numbers), the split of _live
+    self._part_of_flat = dict()  # opened number with a live constraint -> key of its component in _parts
+    self._part_of_cell = dict()  # undecided cell of a live constraint -> key of its component in _parts
+    self._product = [1]  # solutions of all the components per mine count, from _fewest mines on
+    self._fewest = 0
+    self._frontier = 0  # cells of all the components
+    self._unsolvable = 0  # components with no solution, which are not in the product
+    self._result = None  # (frontier probabilities, probability of the other closed cells)
+    self.update(flat for flat in range(len(core.opened)) if core.opened[flat])
+
+  def update(self, cells):
+    """Take the cells opened since the last update into account"""
+    core = self.core
+    touched = set()
+    for flat in cells:
+      touched.add(flat)
+      touched.update(core.neighbours(flat))
+      self._mines.discard(flat)
+      self._safe.discard(flat)
+
+    pending = set()
+    for flat in touched:
+      if not core.opened[flat] or core.mines[flat]:
+        continue
+      unknown = tuple(nb for nb in core.neighbours(flat) if not core.opened[nb])
+      if unknown:
+        # an opened mine, once the game is lost, is not among the unknown cells
+        count = core.numbers[flat] - sum(1 for nb in core.neighbours(flat) if core.opened[nb] and core.mines[nb])
+        self._constraints[flat] = (unknown, count)
+        pending.add(flat)
+      else:
+        self._constraints.pop(flat, None)
+        if self._live.pop(flat, None) is not None:
+          self._changed.add(flat)
+    self._settle(pending)
+    self._result = None
+
+  def _settle(self, pending):
+    """Decide what the constraints of pending decide alone, and whatever that decides in turn"""
+    core = self.core
+    mines = self._mines
+    safe = self._safe
+    while pending:
+      flat = pending.pop()
+      group, count = self._constraints[flat]
+      unknown = tuple(cell for cell in group if cell not in mines and cell not in safe)
+      count -= sum(1 for cell in group if cell in mines)
+      if unknown and 0 < count < len(unknown):
+        if self._live.get(flat) != (unknown, count):
+          self._live[flat] = (unknown, count)
+          self._changed.add(flat)
+        continue
+
+      if self._live.pop(flat, None) is not None:
+        self._changed.add(flat)
+      if unknown:
+        (mines if count else safe).update(unknown)
+        for cell in unknown:
+          pending.update(nb for nb in core.neighbours(cell) if nb in self._constraints and nb != flat)
+
+  def _components(self, constraints):
+    by_cell = dict()
+    for i, (group, _) in enumerate(constraints):
+      for cell in group:
+        by_cell.setdefault(cell, list()).append(i)
+
+    seen = set()
+    for first in range(len(constraints)):
+      if first in seen:
+        continue
+      component = list()
+      stack = [first]
+      seen.add(first)
+      while stack:
+        i = stack.pop()
+        component.append(constraints[i])
+        for cell in constraints[i][0]:
+          for j in by_cell[cell]:
+            if j not in seen:
+              seen.add(j)
+              stack.append(j)
+      yield frozenset(component)
+
+  def _counted(self, keys):
+    """Return the Components of keys, counting those not cached, the large ones on the executor"""
+    components = [self._cache.get(key) for key in keys]
+    futures = dict()  # position in keys -> future Component
+    missing = list()
+    for i, key in enumerate(keys):
+      if components[i] is not None:
+        self.hits += 1
+        self._cache.move_to_end(key)
+        continue
+
+      self.misses += 1
+      missing.append(i)
+      if self.executor is not None and len(set().union(*(group for group, _ in key))) >= self.min_parallel:
+        futures[i] = self.executor.submit(Component, list(key))
+      else:
+        components[i] = Component(list(key))
+    for i, future in futures.items():
+      components[i] = future.result()
+
+    for i in missing:
+      self._cache[keys[i]] = components[i]
+    while len(self._cache) > self.max_cache:
+      self._cache.popitem(last=False)
+    return components
+
+  def _split(self):
+    """Split again the components holding the live constraints changed since the last split"""
+    affected = set()
+    flats = set()
+    for flat in self._changed:
+      if flat in self._part_of_flat:
+        affected.add(self._part_of_flat[flat])
+      if flat in self._live:
+        flats.add(flat)
+        affected.update(self._part_of_cell[cell] for cell in self._live[flat][0] if cell in self._part_of_cell)
+    self._changed = set()
+
+    for key in affected:
+      component, owners = self._parts.pop(key)
+      self._take(component, -1)
+      for cell in component.cells:
+        del self._part_of_cell[cell]
+      for flat in owners:
+        del self._part_of_flat[flat]
+        if flat in self._live:
+          flats.add(flat)
+
+    # opened numbers may share a constraint, which counts once
+    owners = dict()
+    for flat in flats:
+      owners.setdefault(self._live[flat], list()).append(flat)
+    keys = list(self._components(list(owners)))
+    for key, component in zip(keys, self._counted(keys)):
+      part = [flat for constraint in key for flat in owners[constraint]]
+      self._parts[key] = (component, part)
+      for flat in part:
+        self._part_of_flat[flat] = key
+      for cell in component.cells:
+        self._part_of_cell[cell] = key
+      self._take(component, 1)
+
+  def _take(self, component, sign):
+    """Multiply component into the product of the frontier, or divide it out with sign -1"""
+    self._frontier += sign*len(component.cells)
+    if not any(component.totals):
+      self._unsolvable += sign
+    elif sign > 0:
+      self._product = _times(self._product, component.totals)
+      self._fewest += component.fewest
+    else:
+      self._product = _over(self._product, component.totals)
+      self._fewest -= component.fewest
+
+  def probabilities(self):
+    """Return a dict of the mine probability of every frontier cell, and that of any other closed cell"""
+    if self._result is not None:
+      return self._result
+
+    self._split()
+    core = self.core
+    others = core.opened.count(0) - self._frontier - len(self._mines) - len(self._safe)
+    mines = core.n - len(self._mines)
+    if core.game_over:  # an opened mine is not a closed cell
+      mines -= sum(1 for flat in range(len(core.mines)) if core.opened[flat] and core.mines[flat])
+
+    # totals[k] counts the frontier solutions with fewest + k mines and weight[k] the ways to place the others
+    totals = self._product
+    fewest = self._fewest
+    weight = _binomials(others, mines - fewest, len(totals))
+    total = sum(map(operator.mul, totals, weight))
+    if self._unsolvable or not total:
+      self._result = (dict(), 0.0)
+      return self._result
+
+    probabilities = dict.fromkeys(self._safe, 0.0)
+    probabilities.update(dict.fromkeys(self._mines, 1.0))
+    weights = dict()  # totals of a component -> weight of it holding fewest + j mines, summed over the rest of the frontier
+    for component, _ in self._parts.values():
+      key = tuple(component.totals)
+      component_weight = weights.get(key)
+      if component_weight is None:
+        # the rest of the frontier holds the mines of rest[m] from its fewest on, that is k = j + m
+        rest = _over(totals, component.totals)
+        component_weight = weights[key] = [sum(map(operator.mul, rest, weight[j:])) for j in range(len(key))]
+      for cell, mined in component.marginals.items():
+        probabilities[cell] = sum(map(operator.mul, mined, component_weight)) / total
+
+    if others:
+      expected = sum(ways*weight[k]*(mines - fewest - k) for k, ways in enumerate(totals))
+      other = expected / (total*others)
+    else:
+      other = 0.0
+    self._result = (probabilities, other)
+    return self._result
+
+  def probability(self, flat):
+    """Return the mine probability of a closed cell"""
+    probabilities, other = self.probabilities()
+    return probabilities.get(flat, other)
+
+  def safest(self):
+    """Return the closed cell least likely to be a mine and its probability"""
+    probabilities, other = self.probabilities()
+    best = min(probabilities.items(), key=lambda item: item[1], default=(None, 2))
+    if other < best[1]:
+      core = self.core
+      for flat in range(len(core.opened)):
+        if not core.opened[flat] and flat not in probabilities:
+          return flat, other
+    return best
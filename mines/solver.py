@@ -0,0 +1,293 @@
+import collections, time
+from . import probability
+
+
+def solve_component(cells, constraints):
+  """Return the mine probability of cells by counting the solutions of their constraints
+
+  constraints are the (cells, mine count) of a connected component, and cells
+  all of theirs. Solutions are counted by mines.probability.Component, whose
+  dynamic programming grows with how many constraints are open at a time
+  rather than exponentially with the cells. This is a plain function so
+  components can be solved by the processes of an executor.
+  """
+  component = probability.Component(constraints)
+  solutions = sum(component.totals)
+  if not solutions:  # flags on the board contradict the numbers
+    return {cell: 0.5 for cell in cells}
+  return {cell: sum(component.marginals[cell]) / solutions for cell in cells}
+
+
+class SolverStats:
+  """Counters of the moves made by Solvers"""
+  def __init__(self):
+    self.deterministic = 0
+    self.guesses = 0
+    self.latencies = list()  # seconds taken by every move
+
+  @property
+  def moves(self):
+    return self.deterministic + self.guesses
+
+  @property
+  def deterministic_ratio(self):
+    return self.deterministic / self.moves if self.moves else 0.0
+
+  def merge(self, other):
+    self.deterministic += other.deterministic
+    self.guesses += other.guesses
+    self.latencies.extend(other.latencies)
+
+
+class Solver:
+  """Plays a BoardCore by deduction and guesses only when nothing is certain
+
+  Every move opens all the cells proven safe and flags all the cells proven
+  to be mines. Rules are tried from the cheapest: single cells, then subset
+  pairs of constraints, then exact enumeration of each frontier component.
+  Flags on the board are trusted to be mines.
+  The first click is always safe, so it counts as a deterministic move.
+  Given an executor, like a concurrent.futures.ProcessPoolExecutor, the
+  components of at least min_parallel cells are enumerated by its workers,
+  so a single huge board is solved on every core.
+  """
+  def __init__(self, core, max_component=48, max_cache=1024, *, executor=None, min_parallel=16):
+    self.core = core
+    self.max_component = max_component  # larger components are estimated, not enumerated
+    self.max_cache = max_cache
+    self.executor = executor
+    self.min_parallel = min_parallel  # smaller components are not worth sending to a worker
+    self.stats = SolverStats()
+
+    self._frontier = set()  # opened numbers which may still have closed neighbours
+    self._dirty = set()  # frontier cells whose neighbourhood changed
+    self._probabilities = dict()  # of the frontier cells, from the last enumeration
+    self._solved = collections.OrderedDict()  # frozenset of constraints -> probabilities of their cells
+    self._track(flat for flat in range(len(core.opened)) if core.opened[flat])
+
+  @property
+  def won(self):
+    return self.core.won
+
+  @property
+  def done(self):
+    return self.core.game_over or self.won
+
+  def play(self):
+    """Make moves until the game ends and return whether it is won"""
+    while not self.done:
+      self.step()
+    return self.won
+
+  def solve(self):
+    """Make only deterministic moves and return whether they clear the board"""
+    while not self.done:
+      if self.step(guess=False) is None:
+        return False
+    return self.won
+
+  def step(self, guess=True):
+    """Make one move and return the flat indexes opened by it
+
+    Without guess, None is returned instead of guessing when nothing is certain.
+    """
+    start = time.perf_counter()
+    core = self.core
+
+    guessed = False
+    if not core.safe_opened:
+      click = core.first_click or (core.x // 2, core.y // 2)
+      safe = [core.to_flat(click)]
+      mines = ()
+    else:
+      safe, mines = self._deduce()
+      if not safe and not mines:
+        if not guess:
+          return None
+        safe = [self._guess()]
+        guessed = True
+
+    for flat in mines:
+      core.toggle_flag(core.to_index(flat))
+      self._touch(flat)
+
+    opened = list()
+    for flat in safe:
+      opened.extend(core.open(core.to_index(flat)))
+    self._track(opened)
+
+    if guessed:
+      self.stats.guesses += 1
+    else:
+      self.stats.deterministic += 1
+    self.stats.latencies.append(time.perf_counter() - start)
+    return opened
+
+  def _touch(self, flat):
+    for nb in self.core.neighbours(flat):
+      if nb in self._frontier:
+        self._dirty.add(nb)
+
+  def _track(self, cells):
+    core = self.core
+    for flat in cells:
+      if core.mines[flat]:
+        continue
+      if core.numbers[flat]:
+        self._frontier.add(flat)
+        self._dirty.add(flat)
+      self._touch(flat)
+
+  def _constraint(self, flat):
+    """Return the closed unflagged neighbours of flat and how many of them are mines"""
+    core = self.core
+    unknown = [nb for nb in core.neighbours(flat) if not core.opened[nb] and not core.flaged[nb]]
+    return unknown, core.numbers[flat] - core.flaged_around[flat]
+
+  def _deduce(self):
+    """Return the sets of cells proven safe and proven mines"""
+    safe = set()
+    mines = set()
+
+    # single cells, only where something changed since the last move
+    dirty = self._dirty
+    self._dirty = set()
+    for flat in dirty:
+      if flat not in self._frontier:
+        continue
+      unknown, count = self._constraint(flat)
+      if not unknown:
+        self._frontier.discard(flat)
+      elif count == 0:
+        safe.update(unknown)
+      elif count == len(unknown):
+        mines.update(unknown)
+    if safe or mines:
+      return safe, mines
+
+    constraints = set()
+    for flat in self._frontier:
+      unknown, count = self._constraint(flat)
+      if unknown:
+        constraints.add((frozenset(unknown), count))
+    constraints = list(constraints)
+
+    # subset pairs: if a is inside b, b - a holds the difference of the counts
+    by_cell = dict()
+    for i, (cells, _) in enumerate(constraints):
+      for cell in cells:
+        by_cell.setdefault(cell, list()).append(i)
+    for i, (a, count_a) in enumerate(constraints):
+      for j in {j for cell in a for j in by_cell[cell]}:
+        b, count_b = constraints[j]
+        if i != j and a < b:
+          rest = b - a
+          if count_b == count_a:
+            safe |= rest
+          elif count_b - count_a == len(rest):
+            mines |= rest
+    if safe or mines:
+      return safe, mines
+
+    self._probabilities = self._enumerate(constraints, by_cell)
+    for cell, probability in self._probabilities.items():
+      if probability == 0:
+        safe.add(cell)
+      elif probability == 1:
+        mines.add(cell)
+
+    core = self.core
+    remaining = core.mines_left
+    if not safe and not mines and remaining == 0:
+      safe.update(self._others())
+    return safe, mines
+
+  def _enumerate(self, constraints, by_cell):
+    """Return the mine probability of every frontier cell
+
+    Each connected component of constraints is solved on its own by
+    solve_component, on the executor if there is one and it is large enough.
+    Solved components are cached by their constraints, so a move recounts
+    only the components it changed.
+    """
+    results = list()  # per component, its probabilities or (key, them or their future), merged in order
+    seen = set()
+    for first in range(len(constraints)):
+      if first in seen:
+        continue
+
+      # collect the component, ordering cells so neighbours are assigned together
+      component = list()
+      cells = list()
+      cell_seen = set()
+      stack = [first]
+      seen.add(first)
+      while stack:
+        i = stack.pop()
+        component.append(i)
+        for cell in constraints[i][0]:
+          if cell not in cell_seen:
+            cell_seen.add(cell)
+            cells.append(cell)
+            for j in by_cell[cell]:
+              if j not in seen:
+                seen.add(j)
+                stack.append(j)
+
+      if len(cells) > self.max_component:
+        estimate = dict()
+        for i in component:
+          group, count = constraints[i]
+          for cell in group:
+            estimate[cell] = max(estimate.get(cell, 0), count / len(group))
+        results.append(estimate)
+        continue
+
+      component = [constraints[i] for i in component]
+      key = frozenset(component)
+      solved = self._solved.get(key)
+      if solved is not None:
+        # in the order of cells, so ties are broken like on a fresh count
+        self._solved.move_to_end(key)
+        results.append({cell: solved[cell] for cell in cells})
+      elif self.executor is not None and len(cells) >= self.min_parallel:
+        results.append((key, self.executor.submit(solve_component, cells, component)))
+      else:
+        results.append((key, solve_component(cells, component)))
+
+    probabilities = dict()
+    for result in results:
+      if isinstance(result, tuple):
+        key, result = result
+        if not isinstance(result, dict):
+          result = result.result()
+        self._solved[key] = result
+      probabilities.update(result)
+    while len(self._solved) > self.max_cache:
+      self._solved.popitem(last=False)
+    return probabilities
+
+  def _others(self):
+    """Return the closed unflagged cells which are not on the frontier"""
+    core = self.core
+    frontier_cells = set(self._probabilities)
+    return [flat for flat in range(len(core.opened))
+            if not core.opened[flat] and not core.flaged[flat] and flat not in frontier_cells]
+
+  def _guess(self):
+    """Return the closed cell least likely to be a mine"""
+    core = self.core
+    probabilities = self._probabilities
+    others = self._others()
+
+    best = None
+    best_probability = 2
+    if others:
+      remaining = core.mines_left - sum(probabilities.values())
+      best = others[0]
+      best_probability = max(remaining, 0) / len(others)
+    for cell, probability in probabilities.items():
+      if probability < best_probability:
+        best = cell
+        best_probability = probability
+    return best
@@ -1,195 +1,556 @@
-import pygame
-import pypower.game, pypower.scene, pypower.sprite, pypower.color, pypower.direction
-import random
+import pygame, os, random, sys
+import pypower.game, pypower.scene, pypower.sprite, pypower.color, pypower.atlas, pypower.camera, pypower.directory
+import mines.board, mines.noguess, mines.chunked, mines.movelog, mines.probability
+try:
+  import mines.analysis as analysis
+except ImportError:  # it needs NumPy; without it finished games get no 3BV/s
+  analysis = None
 
 class Minesweeper(pypower.game.Game):
-  def __init__(self):
-    super().__init__(1080, 720, 60)
+  def __init__(self, profile_path=None):
+    super().__init__(1080, 720, 60, ups=60, profile=profile_path is not None)
+    self.profile_path = profile_path  # the frames are written there on exit, CSV if it ends with .csv
+    self.board_pool = mines.noguess.BoardPool()
+    self.log_path = os.path.join(pypower.directory.cache_dir, "games.mslog")  # move logs of the games played
     self.scene_manager.init("Main", MainScene(self))
+    self.scene_manager["Huge"] = HugeScene(self)
 
     pygame.display.set_caption("Minesweeper")
 
+  def run(self):
+    super().run()
+    self.board_pool.save()
+    self.save_log(self.scene_manager["Main"].board)
+    if self.profiler is not None:
+      self.profiler.dump(self.profile_path)
+
+  def save_log(self, board):
+    """Append the move log of board to log_path, if it has any move"""
+    if board.log is not None and len(board.log):
+      os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+      mines.movelog.write_logs(self.log_path, [board.log])
+
 
 class MainScene(pypower.scene.Scene):
+  other_scene = "Huge"  # switched to by H
+
   def __init__(self, game):
     super().__init__(game)
     
+    self.no_guess = False  # applied from the next board
+    self.hints = False  # whether closed cells are tinted by their mine probability
     self.board = Board(16, 16, 40)
     self.all_sprites.add(self.board)
+    self.all_sprites.add(Hud(self, 560, 32))
+
+    # the board of the next game is made on a worker while this one is played
+    self._next = None  # (no_guess, Board) ready to be swapped in
+    self._preparing = False
+    self._restart = False  # whether a restart waits for the board being made
+    self._prepare_next()
+
+  def new_board(self):
+    if self._next is not None and self._next[0] != self.no_guess:
+      # made before N was pressed
+      self._next[1].recycle()
+      self._next = None
+
+    if self._next is not None:
+      self._set_board(self._next[1])
+      self._next = None
+      self._prepare_next()
+    elif not self.no_guess:
+      self._set_board(Board(self.board.x, self.board.y, self.board.n))
+      self._prepare_next()
+    else:
+      # taking a no guess board may have to generate it, which must not stall the frame
+      self._restart = True
+      self._prepare_next()
+
+  def _prepare_next(self):
+    if not self._preparing:
+      self._preparing = True
+      self.game.tasks.submit(self._make_board, self.board.x, self.board.y, self.board.n, self.no_guess,
+                             callback=self._prepared)
+
+  def _make_board(self, x, y, n, no_guess):
+    # runs on a worker; pooled boards come with their first click, opened when swapped in
+    core = self.game.board_pool.take(x, y, n) if no_guess else None
+    return no_guess, Board(x, y, n, core=core)
+
+  def _prepared(self, result):
+    self._preparing = False
+    if result[0] != self.no_guess:
+      result[1].recycle()
+      self._prepare_next()
+      return
+
+    self._next = result
+    if self._restart:
+      self._restart = False
+      self.new_board()
+
+  def _set_board(self, board):
+    self.game.save_log(self.board)
+    self.board.kill()
+    self.board.recycle()
+    self.board = board
+    self.all_sprites.add(self.board)
+    if board.core.initialized:
+      self.board.open(board.core.first_click, self.game.steps)
+    self.board.show_hints(self.hints)
+
+  def toggle_key(self, event):
+    if event.type == pygame.MOUSEBUTTONDOWN and event.button == 3 and self.board.rect.collidepoint(event.pos):
+      return ("flag", self.board.get_index_from_pos(event.pos))
+    elif event.type == pygame.KEYDOWN and event.key == pygame.K_n:
+      return ("no_guess",)
+    elif event.type == pygame.KEYDOWN and event.key == pygame.K_p:
+      return ("hints",)
+    return None
 
   def handle_events(self, events):
     for event in events:
       if event.type == pygame.MOUSEBUTTONDOWN:
-        for spr in self.all_sprites:
-          if spr.rect.collidepoint(event.pos):
-            if spr == self.board and not self.board.game_over:
-              index = self.board.get_index_from_pos(event.pos)
-              if event.button == 1:
-                # Open Box
-                self.board.open(index)
-                if self.board.game_over:
-                  # Game Over
-                  pass
-              elif event.button == 2:
-                # Open Surrounding Boxes
-                flaged = 0
-                for direction in pypower.direction.DIRECTIONS8:
-                  if self.board.is_flaged(index+direction):
-                    flaged += 1
-
-                if self.board.is_opened(index) and flaged == self.board.get_number(index):
-                  for direction in pypower.direction.DIRECTIONS8:
-                    self.board.open(index+direction)
-
-                  if self.board.game_over:
-                    # Game Over
-                    pass
-              elif event.button == 3:
-                # Toggle Flag
-                self.board.toggle_flag(index)
+        for spr in self.sprites_at(event.pos):
+          if spr == self.board and not self.board.game_over and not self.board.won:
+            index = self.board.get_index_from_pos(event.pos)
+            if event.button == 1:
+              # Open Box
+              self.board.open(index, self.game.steps)
+              if self.board.game_over:
+                # Game Over
+                pass
+            elif event.button == 2:
+              # Open Surrounding Boxes
+              self.board.chord(index, self.game.steps)
+              if self.board.game_over:
+                # Game Over
+                pass
+            elif event.button == 3:
+              # Toggle Flag
+              self.board.toggle_flag(index, self.game.steps)
       elif event.type == pygame.KEYDOWN:
         if event.key == pygame.K_SPACE:
-          self.board.kill()
-          self.board = Board(self.board.x, self.board.y, self.board.n)
-          self.all_sprites.add(self.board)
-                
-class Board(pypower.sprite.Composite):
-  def __init__(self, x, y, n):
-    super().__init__(0, 0, 32*x, 32*y)
+          self.new_board()
+        elif event.key == pygame.K_n:
+          self.no_guess = not self.no_guess
+        elif event.key == pygame.K_p:
+          self.hints = not self.hints
+          self.board.show_hints(self.hints)
+        elif event.key == pygame.K_h:
+          self.game.scene_manager.next = self.other_scene
+
+
+class HugeScene(MainScene):
+  """Huge board seen through a camera, scrolled by the arrow keys and zoomed by the wheel"""
+  other_scene = "Main"
+  SCROLL_SPEED = 16  # screen pixels per frame
+
+  def __init__(self, game, x=10000, y=10000, density=0.15):
+    pypower.scene.Scene.__init__(self, game)
+
+    self.no_guess = False  # not supported on chunked boards
+    self.hints = False  # not supported either
+    self.camera = pypower.camera.Camera(game.screen.get_rect(), bounds=(0, 0, 32*x, 32*y))
+    self.board = ChunkedBoardView(mines.chunked.ChunkedBoard(x, y, density), self.camera)
+    self.all_sprites.add(self.board)
+
+  def new_board(self):
+    core = self.board.core
+    self.board.kill()
+    self.board = ChunkedBoardView(mines.chunked.ChunkedBoard(core.x, core.y, core.density), self.camera)
+    self.all_sprites.add(self.board)
+
+  def handle_events(self, events):
+    for event in events:
+      if event.type == pygame.MOUSEBUTTONDOWN and event.button in (4, 5):
+        self.camera.zoom_at(2 if event.button == 4 else 0.5, event.pos)
+    super().handle_events(events)
+
+  def update(self):
+    pressed = pygame.key.get_pressed()
+    dx = (pressed[pygame.K_RIGHT] - pressed[pygame.K_LEFT]) * self.SCROLL_SPEED
+    dy = (pressed[pygame.K_DOWN] - pressed[pygame.K_UP]) * self.SCROLL_SPEED
+    if dx or dy:
+      self.camera.move(dx, dy)
+    super().update()
+
+
+class Hud(pypower.sprite.Composite):
+  """Mines left, time played, result and 3BV/s of the game on the board of a scene
+
+  Every value is read from counters the board keeps, and a text is set
+  only when it changes, so most frames draw nothing.
+  """
+  def __init__(self, scene, left, top):
+    super().__init__(left, top, 320, 160)
+    self.scene = scene
+    self.mines_text = pypower.sprite.Text(" ", (0, 0), 30)
+    self.time_text = pypower.sprite.Text(" ", (0, 40), 30)
+    self.status_text = pypower.sprite.Text(" ", (0, 80), 30)
+    self.speed_text = pypower.sprite.Text(" ", (0, 120), 30)
+    for text in (self.mines_text, self.time_text, self.status_text, self.speed_text):
+      self.add(text)
+
+  def update(self):
+    board = self.scene.board
+    game = self.scene.game
+    if board.start_frame is None:
+      seconds = 0
+    else:
+      end = board.end_frame if board.end_frame is not None else game.steps
+      seconds = int((end - board.start_frame)*game.dt)
+    status = "You win!" if board.won else "Game over" if board.game_over else " "
+    if board.bbbv is not None:
+      solved, total = board.bbbv
+      played = max((board.end_frame - board.start_frame)*game.dt, game.dt)
+      speed = f"3BV {solved}/{total} {solved / played:.2f}/s"
+    else:
+      speed = " "
+    self._set(self.mines_text, f"Mines {board.mines_left}")
+    self._set(self.time_text, f"Time {seconds}")
+    self._set(self.status_text, status)
+    self._set(self.speed_text, speed)
+    super().update()
+
+  def _set(self, text, value):
+    if text.text != value:
+      text.text = value
+
+
+_atlases = dict()  # tile size -> TileAtlas
+
+
+def get_tile_atlas(size=32):
+  """Return the shared atlas with tiles of size x size pixels, made once pygame is initialized"""
+  if size not in _atlases:
+    _atlases[size] = make_tile_atlas() if size == 32 else get_tile_atlas().scaled((size, size))
+  return _atlases[size]
+
+
+def make_tile_atlas():
+  """Render a 32x32 tile for every state code of mines.board"""
+  atlas = pypower.atlas.TileAtlas((32, 32), mines.board.STATES)
+  for number in range(9):
+    atlas[number].fill(pypower.color.WHITEGRAY)
+    if number:
+      text = pypower.sprite.Text(str(number), (15,15), 30, alignment=(0,0), color=pypower.color.BLACK)
+      atlas[number].blit(text.image, text.rect)
+  atlas[mines.board.CLOSED].fill(pypower.color.GRAY)
+  atlas[mines.board.FLAG].fill(pypower.color.YELLOW)
+  atlas[mines.board.MINE].fill(pypower.color.RED)
+  return atlas
+
+
+_hint_tiles = list()  # closed tiles tinted red from a mine probability of 0 to 1
+
+
+def get_hint_tiles(levels=11):
+  """Return the closed tiles tinted for levels evenly spaced mine probabilities, made once"""
+  if not _hint_tiles:
+    closed = get_tile_atlas()[mines.board.CLOSED]
+    for level in range(levels):
+      tint = pygame.Surface(closed.get_size(), pygame.SRCALPHA)
+      tint.fill((*pypower.color.RED, 200*level // (levels - 1)))
+      tile = closed.copy()
+      tile.blit(tint, (0, 0))
+      _hint_tiles.append(tile)
+  return _hint_tiles
+
+
+class Board(pypower.sprite.Sprite):
+  """Sprite view of a mines.board.BoardCore, a new one unless core is given
+
+  Cells are drawn by blitting the tile of their state code,
+  and only the cells changed by a move are drawn and repainted.
+  With hints shown, closed cells are tinted by their mine probability from
+  a mines.probability.ProbabilityEngine, made the first time they are shown.
+  """
+  # beyond this many changed cells their bounding rect is repainted instead
+  MAX_REPAINT_RECTS = 32
+
+  def __init__(self, x, y, n, *, seed=None, rng=None, core=None):
+    super().__init__()
+    if core is None and rng is None and seed is None:
+      seed = random.randrange(2**63)
+    self.core = core if core is not None else mines.board.BoardCore(x, y, n, seed=seed, rng=rng)
+
+    # moves are logged if the game can be played again from its seed or its board
+    if core is not None:
+      self.log = mines.movelog.MoveLog(x, y, n, core=core) if core.initialized else None
+    else:
+      self.log = mines.movelog.MoveLog(x, y, n, seed) if rng is None else None
     self.x = x
     self.y = y
     self.n = n
-    
-    if n > x*y - 9:
-      raise ValueError("Too Many Mines!")
-    
-    self._initialized = False
-    self.game_over = False
 
-    self._boxes = [[Box(i, j) for j in range(y)] for i in range(x)]
-    for box_column in self._boxes:
-      for box in box_column:
-        self.add(box)
+    self.engine = None  # kept up to date by every move once made
+    self.start_frame = None  # frame of the first move opening cells
+    self.end_frame = None  # frame the game was won or lost on
+    self.bbbv = None  # (3BV cleared, 3BV of the board) once the game ended
+    self._hints = None  # flat -> hint level drawn on each closed cell while hints are shown
+    self._other_level = None  # hint level drawn on the closed cells off the frontier
+    self._frontier = set()  # cells of the last probabilities, tinted by their own level
+
+    self.rect = pygame.Rect(0, 0, 32*x, 32*y)
+    self.image = pypower.sprite.surface_pool.acquire(self.rect.size)  # every cell is drawn over it
+    self._draw_cells(range(x*y))
+
+  @property
+  def game_over(self):
+    return self.core.game_over
+
+  @property
+  def won(self):
+    return self.core.won
+
+  @property
+  def mines_left(self):
+    return self.core.mines_left
 
   def get_index_from_pos(self, pos):
     return (pos[0] // 32, pos[1] // 32)
   
   def is_vaild(self, index):
-    return index[0] >= 0 and index[0] < self.x and index[1] >= 0 and index[1] < self.y
-
-  def _get(self, index):
-    if not self.is_vaild(index):
-      raise IndexError("Invaild Index")
-    return self._boxes[index[0]][index[1]]
+    return self.core.is_vaild(index)
 
   def is_opened(self, index):
-    if self.is_vaild(index):
-      return self._get(index).opened
-    else:
-      return False
+    return self.core.is_opened(index)
 
   def is_flaged(self, index):
-    if self.is_vaild(index):
-      return self._get(index).flaged
-    else:
-      return False
+    return self.core.is_flaged(index)
 
   def is_mine(self, index):
-    if self.is_vaild(index):
-      return self._get(index).mine
-    else:
-      return False
+    return self.core.is_mine(index)
 
   def get_number(self, index):
-    if self.is_vaild(index):
-      return self._get(index).number
-    else:
-      raise IndexError("Invaild Index")
+    return self.core.get_number(index)
 
-  def toggle_flag(self, index):
-    if self.is_vaild(index) and not self.is_opened(index):
-      self._get(index).toggle_flag()
+  def toggle_flag(self, index, frame=0):
+    self._record(mines.movelog.FLAG, index, frame)
+    if self.core.toggle_flag(index):
+      flat = self.core.to_flat(index)
+      self._draw_cells([flat])
+      self._draw_hints([flat])
 
-  def init(self, index):
-    self._initialized = True
-    
-    mine = 0
-    while mine <= self.n:
-      rand_index = (random.randint(0, self.x-1), random.randint(0, self.y-1))
-           
-      if self.is_mine(rand_index):
+  def open(self, index, frame=0):
+    self._record(mines.movelog.OPEN, index, frame)
+    self._opened(self.core.open(index), frame)
+
+  def chord(self, index, frame=0):
+    self._record(mines.movelog.CHORD, index, frame)
+    self._opened(self.core.chord(index), frame)
+
+  def _opened(self, cells, frame):
+    if cells and self.start_frame is None:
+      self.start_frame = frame
+    if self.end_frame is None and (self.core.game_over or self.core.won):
+      self.end_frame = frame
+      if analysis is not None:
+        metrics = analysis.board_metrics(self.core)
+        self.bbbv = (metrics["solved"], metrics["bbbv"])
+    if self.engine is not None:
+      self.engine.update(cells)
+    self._draw_cells(cells)
+    self._draw_hints(cells)
+
+  def show_hints(self, show):
+    """Tint the closed cells by their mine probability, or draw them plain again"""
+    if show and self._hints is None:
+      if self.engine is None:
+        self.engine = mines.probability.ProbabilityEngine(self.core)
+      self._hints = dict()
+      self._other_level = None
+      self._frontier = set()
+      self._draw_hints()
+    elif not show and self._hints is not None:
+      self._draw_cells(list(self._hints))
+      self._hints = None
+
+  def _record(self, op, index, frame):
+    if self.log is not None and self.core.is_vaild(index):
+      self.log.append(op, self.core.to_flat(index), frame)
+
+  def recycle(self):
+    pypower.sprite.surface_pool.release(self.image)
+    self.image = None
+
+  def _draw_hints(self, changed=()):
+    # only the closed cells whose level changed are drawn; the others lose their hint
+    # all the cells are visited only when the level off the frontier changed
+    if self._hints is None:
+      return
+    core = self.core
+    tiles = get_hint_tiles()
+    probabilities, other = self.engine.probabilities()
+    other_level = round(other*(len(tiles) - 1))
+    if other_level != self._other_level:
+      self._other_level = other_level
+      visit = range(len(core.opened))
+    else:
+      visit = self._frontier.union(probabilities, changed)
+    self._frontier = set(probabilities)
+    cells = list()
+    for flat in visit:
+      if core.opened[flat] or core.flaged[flat]:
+        self._hints.pop(flat, None)
         continue
-        
-      ok = True
-      for direction in pypower.direction.DIRECTIONS8:
-        if index+direction == rand_index:
-          ok = False
-        
-      if ok:
-        self._get(rand_index).mine = True
-        mine += 1
-        for direction in pypower.direction.DIRECTIONS8:
-          if self.is_vaild(rand_index+direction):
-            self._get(rand_index+direction).number += 1
-          
-  def open(self, index):
-    if not self.is_vaild(index) or self.is_flaged(index):
+      level = round(probabilities.get(flat, other)*(len(tiles) - 1))
+      if self._hints.get(flat) != level:
+        self._hints[flat] = level
+        cells.append(flat)
+    self._draw_cells(cells, [tiles[self._hints[flat]] for flat in cells])
+
+  def _draw_cells(self, cells, tiles=None):
+    """Draw cells with the tile of their state, or with tiles if given"""
+    core = self.core
+    x = self.x
+    rects = [pygame.Rect((flat % x)*32, (flat // x)*32, 32, 32) for flat in cells]
+    if not rects:
       return
 
-    if not self._initialized:
-      self.init(index)
-    
-    self._get(index).open()
-    
-    if self.is_mine(index):
-      self.game_over = True
-      
-    if self._get(index).number == 0:
-      for direction in pypower.direction.DIRECTIONS8:
-        if self.is_vaild(index+direction) and not self.is_opened(index+direction) and not self.is_flaged(index+direction):
-          self.open(index+direction)
+    if tiles is None:
+      atlas = get_tile_atlas()
+      tiles = [atlas[core.get_state(flat)] for flat in cells]
+    self.image.blits(list(zip(tiles, rects)), doreturn=False)
+    if len(rects) > self.MAX_REPAINT_RECTS:
+      rects = [rects[0].unionall(rects)]
+    self.repaint(rects)
 
 
-class Box(pypower.sprite.Composite):
-  def __init__(self, x, y):
-    super().__init__(x*32, y*32, 32, 32)
+class ChunkedBoardView(pypower.sprite.Sprite):
+  """Sprite drawing the cells of a mines.chunked.ChunkedBoard seen by a camera
 
-    self.mine = False
-    self.opened = False
-    self.flaged = False
-    self.number = 0
+  The image covers only the camera's viewport and only visible cells are
+  drawn, so frame time and memory do not depend on the size of the board.
+  """
+  def __init__(self, core, camera):
+    super().__init__()
+    self.core = core
+    self.camera = camera
+    self.rect = camera.viewport.copy()
+    self.image = pygame.Surface(self.rect.size)
+    self._version = None  # camera version drawn last
+    self._closed = None  # closed tiles covering the viewport
 
-    self.bgd.fill(pypower.color.GRAY)
+  @property
+  def game_over(self):
+    return self.core.game_over
 
-  def open(self):
-    if self.opened or self.flaged:
-      return
-    
-    self.opened = True
-    self.set_dirty()
+  @property
+  def won(self):
+    return False  # never, as long as most of a huge board stays closed
 
-    if self.mine:
-      self.bgd.fill(pypower.color.RED)
-      self.image.fill(pypower.color.RED)
-    else:
-      self.bgd.fill(pypower.color.WHITEGRAY)
-      self.image.fill(pypower.color.WHITEGRAY)
-      if self.number:
-        self.add(pypower.sprite.Text(str(self.number), (15,15), 30, alignment=(0,0), color=pypower.color.BLACK))
+  def get_index_from_pos(self, pos):
+    world = self.camera.to_world(pos)
+    return (int(world[0] // 32), int(world[1] // 32))
 
-  def toggle_flag(self):
-    self.flaged = not self.flaged
-    
-    if self.flaged:
-      self.bgd.fill(pypower.color.YELLOW)
-      self.image.fill(pypower.color.YELLOW)
-    else:
-      self.bgd.fill(pypower.color.GRAY)
-      self.image.fill(pypower.color.GRAY)
+  def is_vaild(self, index):
+    return self.core.is_vaild(index)
+
+  def is_opened(self, index):
+    return self.core.is_opened(index)
+
+  def is_flaged(self, index):
+    return self.core.is_flaged(index)
+
+  def is_mine(self, index):
+    return self.core.is_mine(index)
+
+  def get_number(self, index):
+    return self.core.get_number(index)
+
+  def toggle_flag(self, index, frame=0):
+    if self.core.toggle_flag(index):
+      self._draw_cells([index])
+
+  def open(self, index, frame=0):
+    self._draw_cells(self.core.open(index))
+
+  def chord(self, index, frame=0):
+    self._draw_cells(self.core.chord(index))
 
+  def show_hints(self, show):
+    pass  # probabilities are not computed on chunked boards
+
+  def update(self):
+    if self.core.filling:
+      # a zero region too large for one frame goes on opening over the next ones
+      self._draw_cells(self.core.fill())
+    if self._version != self.camera.version:
+      self._draw_view()
+
+  def _cell_rect(self, index, tile):
+    left, top = self.camera.to_screen((index[0]*32, index[1]*32))
+    return pygame.Rect(round(left) - self.rect.x, round(top) - self.rect.y, tile, tile)
+
+  def _closed_background(self, tile):
+    """Return a surface of closed tiles covering the viewport at any grid offset"""
+    if self._closed is None or self._closed.get_width() != self.rect.width + 2*tile:
+      closed = get_tile_atlas(tile)[mines.board.CLOSED]
+      self._closed = pygame.Surface((self.rect.width + 2*tile, self.rect.height + 2*tile))
+      for top in range(0, self._closed.get_height(), tile):
+        for left in range(0, self._closed.get_width(), tile):
+          self._closed.blit(closed, (left, top))
+    return self._closed
+
+  def _draw_view(self):
+    self._version = self.camera.version
+    tile = max(1, round(32*self.camera.zoom))
+    atlas = get_tile_atlas(tile)
+    view = self.camera.world_rect()
+    core = self.core
+    left = max(0, view.left // 32)
+    top = max(0, view.top // 32)
+    right = min(core.x, view.right // 32 + 1)
+    bottom = min(core.y, view.bottom // 32 + 1)
+
+    # closed cells everywhere on the board, then the cells of the chunks ever played on
+    self.image.fill(pypower.color.BLACK)
+    origin = self._cell_rect((0, 0), tile)
+    self.image.set_clip(pygame.Rect(origin.topleft, (core.x*tile, core.y*tile)))
+    self.image.blit(self._closed_background(tile), self._cell_rect((left, top), tile))
+    self.image.set_clip(None)
+
+    chunk = mines.chunked.CHUNK
+    blits = list()
+    for ky in range(top // chunk, (bottom - 1) // chunk + 1):
+      for kx in range(left // chunk, (right - 1) // chunk + 1):
+        if not core.has_chunk((kx, ky)):
+          continue
+        for cy in range(max(top, ky*chunk), min(bottom, (ky + 1)*chunk)):
+          for cx in range(max(left, kx*chunk), min(right, (kx + 1)*chunk)):
+            state = core.get_state((cx, cy))
+            if state != mines.board.CLOSED:
+              blits.append((atlas[state], self._cell_rect((cx, cy), tile)))
+    self.image.blits(blits, doreturn=False)
+    core.trim()
     self.set_dirty()
 
-    
+  def _draw_cells(self, cells):
+    if self._version != self.camera.version:
+      return  # the whole view is drawn on the next update
+
+    view = self.camera.world_rect()
+    left, top = view.left // 32, view.top // 32
+    right, bottom = view.right // 32, view.bottom // 32
+    cells = [index for index in cells if left <= index[0] <= right and top <= index[1] <= bottom]
+    if not cells:
+      return
+
+    tile = max(1, round(32*self.camera.zoom))
+    atlas = get_tile_atlas(tile)
+    blits = [(atlas[self.core.get_state(index)], self._cell_rect(index, tile)) for index in cells]
+
+    self.image.blits(blits, doreturn=False)
+    rects = [rect for _, rect in blits]
+    if len(rects) > Board.MAX_REPAINT_RECTS:
+      rects = [rects[0].unionall(rects)]
+    self.repaint(rects)
+
+
 if __name__ == "__main__":
-  minesweeper = Minesweeper()
+  # python minesweeper.py [--profile trace.json|frames.csv]
+  minesweeper = Minesweeper(sys.argv[2] if sys.argv[1:2] == ["--profile"] else None)
   minesweeper.run()
\ No newline at end of file
@@ -0,0 +1,24 @@
+import pygame
+
+class TileAtlas:
+  """Tiles of the same size rendered once into a single surface
+
+  Each tile is a subsurface of the atlas, so drawing into atlas[code]
+  draws into the atlas and blitting it needs no surface of its own.
+  """
+  def __init__(self, tile_size, count):
+    self.tile_size = tuple(tile_size)
+    self.surface = pygame.Surface((self.tile_size[0]*count, self.tile_size[1]))
+    self._tiles = [self.surface.subsurface(pygame.Rect((i*self.tile_size[0], 0), self.tile_size)) for i in range(count)]
+
+  def __getitem__(self, code):
+    return self._tiles[code]
+
+  def __len__(self):
+    return len(self._tiles)
+
+  def scaled(self, tile_size):
+    """Return a new TileAtlas with every tile scaled to tile_size"""
+    atlas = TileAtlas(tile_size, len(self))
+    pygame.transform.scale(self.surface, atlas.surface.get_size(), atlas.surface)
+    return atlas
@@ -0,0 +1,74 @@
+import math
+import pygame
+
+class Camera:
+  """Maps a scrollable and zoomable world onto the viewport rect of the screen
+
+  pos is the world position shown at the top left of the viewport and
+  zoom the screen pixels per world unit. version changes whenever the mapping
+  does, so views can tell when they have to be drawn again.
+  """
+  def __init__(self, viewport, pos=(0, 0), zoom=1, *, min_zoom=0.25, max_zoom=4, bounds=None):
+    self.viewport = pygame.Rect(viewport)
+    self.min_zoom = min_zoom
+    self.max_zoom = max_zoom
+    self.bounds = None if bounds is None else pygame.Rect(bounds)  # world rect to keep in view
+    self.version = 0
+
+    self._pos = (float(pos[0]), float(pos[1]))
+    self._zoom = zoom
+    self._clamp()
+
+  @property
+  def pos(self):
+    return self._pos
+
+  @property
+  def zoom(self):
+    return self._zoom
+
+  @pos.setter
+  def pos(self, pos):
+    self._pos = (float(pos[0]), float(pos[1]))
+    self._clamp()
+
+  @zoom.setter
+  def zoom(self, zoom):
+    self.zoom_at(zoom / self._zoom, self.viewport.center)
+
+  def to_world(self, screen_pos):
+    return (self._pos[0] + (screen_pos[0] - self.viewport.x) / self._zoom,
+            self._pos[1] + (screen_pos[1] - self.viewport.y) / self._zoom)
+
+  def to_screen(self, world_pos):
+    return (self.viewport.x + (world_pos[0] - self._pos[0]) * self._zoom,
+            self.viewport.y + (world_pos[1] - self._pos[1]) * self._zoom)
+
+  def world_rect(self):
+    """Return the smallest world Rect covering the viewport"""
+    left = math.floor(self._pos[0])
+    top = math.floor(self._pos[1])
+    right = math.ceil(self._pos[0] + self.viewport.width / self._zoom)
+    bottom = math.ceil(self._pos[1] + self.viewport.height / self._zoom)
+    return pygame.Rect(left, top, right - left, bottom - top)
+
+  def move(self, dx, dy):
+    """Scroll by dx, dy screen pixels"""
+    self.pos = (self._pos[0] + dx / self._zoom, self._pos[1] + dy / self._zoom)
+
+  def zoom_at(self, factor, screen_pos):
+    """Multiply zoom by factor, keeping the world position under screen_pos in place"""
+    world = self.to_world(screen_pos)
+    self._zoom = min(self.max_zoom, max(self.min_zoom, self._zoom * factor))
+    self.pos = (world[0] - (screen_pos[0] - self.viewport.x) / self._zoom,
+                world[1] - (screen_pos[1] - self.viewport.y) / self._zoom)
+
+  def _clamp(self):
+    x, y = self._pos
+    if self.bounds is not None:
+      width = self.viewport.width / self._zoom
+      height = self.viewport.height / self._zoom
+      x = max(self.bounds.left, min(x, self.bounds.right - width))
+      y = max(self.bounds.top, min(y, self.bounds.bottom - height))
+    self._pos = (x, y)
+    self.version += 1
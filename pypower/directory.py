@@ -4,4 +4,4 @@ pypower_dir = path.dirname(__file__)
 home_dir = path.dirname(pypower_dir)
 font_dir = path.join(home_dir, 'font')
 img_dir = path.join(home_dir, 'img')
-
+cache_dir = path.join(home_dir, 'cache')
@@ -0,0 +1,63 @@
+import collections, pygame
+
+def _release(event):
+  """Return what identifies the release of a pressed key or button, None for other events"""
+  if event.type in (pygame.KEYDOWN, pygame.KEYUP):
+    return ("key", event.key)
+  elif event.type in (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP):
+    return ("mouse", event.button)
+  return None
+
+
+def coalesce(events, toggle_key=None):
+  """Return events with the redundant ones of a frame dropped
+
+  A run of mouse motions becomes one motion to the last position, moved by
+  all of them. toggle_key(event) returns a hashable key for events toggling
+  something, like a flag, or None; two toggles of the same key with nothing
+  but toggles, their releases and motions between them cancel out, so
+  neither is handled, and their releases are dropped with them.
+  """
+  result = list()
+  toggles = dict()  # key -> positions in result of a toggle which may be cancelled and of its release
+  pressed = dict()  # release of a toggle still held -> its key
+  dropped = collections.Counter()  # releases of cancelled toggles still to come
+  for event in events:
+    if event.type == pygame.MOUSEMOTION:
+      last = result[-1] if result else None
+      if last is not None and last.type == pygame.MOUSEMOTION:
+        rel = (last.rel[0] + event.rel[0], last.rel[1] + event.rel[1])
+        result[-1] = pygame.event.Event(pygame.MOUSEMOTION, {**event.dict, "rel": rel})
+      else:
+        result.append(event)
+      continue
+
+    key = toggle_key(event) if toggle_key is not None else None
+    release = _release(event)
+    if key is None:
+      if event.type in (pygame.KEYUP, pygame.MOUSEBUTTONUP):
+        if dropped[release]:
+          dropped[release] -= 1
+          continue
+        if release in pressed:
+          toggles[pressed.pop(release)].append(len(result))
+          result.append(event)
+          continue
+      toggles.clear()
+      pressed.clear()
+      result.append(event)
+    elif key in toggles:
+      for position in toggles.pop(key):
+        result[position] = None
+      # the releases of both presses are dropped too, whichever is still to come
+      for held in [held for held, other in pressed.items() if other == key]:
+        del pressed[held]
+        dropped[held] += 1
+      if release is not None:
+        dropped[release] += 1
+    else:
+      toggles[key] = [len(result)]
+      if release is not None:
+        pressed[release] = key
+      result.append(event)
+  return [event for event in result if event is not None]
@@ -1,10 +1,11 @@
 import pygame, sys
 from . import scene_manager
 from . import scene
+from . import profiler, sprite, color, events as events_, tasks
 
 class Game:
   """Main Game Class"""
-  def __init__(self, screen_width, screen_height, fps):
+  def __init__(self, screen_width, screen_height, fps, *, ups=None, max_steps=5, profile=False):
     if (pygame.init()[1]): # initialize pygame
       print("Some Errors Occur on initializing pygame")
       sys.exit(-1)
@@ -13,6 +14,17 @@ class Game:
     self._main_clock = pygame.time.Clock()
     self._fps = fps
 
+    # fixed logic rate in updates per second, None to update once per frame.
+    # with a rate, a frame runs as many updates as the time since the last one
+    # asks for, up to max_steps, and is rendered once
+    self.ups = ups
+    self.max_steps = max_steps
+    self.dt = 1 / (ups or fps) if ups or fps else 0  # seconds per update
+    self.time = 0  # seconds of logic run so far
+    self.steps = 0  # updates run so far
+    self.alpha = 0  # how far the rendered frame is between the last update and the next, for interpolation
+    self._lag = 0
+
     # flag to terminate the game
     self._running = False
 
@@ -22,6 +34,14 @@ class Game:
     # set SceneManager and current scene
     self.scene_manager = scene_manager.SceneManager()
 
+    # expensive work of scenes, run on a worker thread and applied at the start of a frame
+    self.tasks = tasks.TaskQueue()
+
+    # frame profiler, None if not profiling. F3 shows its overlay
+    self.profiler = profiler.FrameProfiler() if profile else None
+    self.show_profiler = False
+    self._overlay_rect = None
+
   def init(self, starting_scene_name, starting_scene):
     self.scene_manager.init(starting_scene_name, starting_scene)
   
@@ -35,8 +55,11 @@ class Game:
       # preprocessing events
       if event.type == pygame.QUIT:
         self.terminate()
+      elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3 and self.profiler is not None:
+        self.show_profiler = not self.show_profiler
       else:
         events.append(event)
+    events = events_.coalesce(events, self.scene_manager.current.toggle_key)  # drop redundant events
     self.scene_manager.current.handle_events(events)  # throw left events to current scene
 
   def _update(self):
@@ -44,23 +67,109 @@ class Game:
     self.scene_manager.current.update()
 
   def _render(self):
-    self.scene_manager.current.render()
-    pygame.display.flip()
+    # scenes returning the changed rects get only those updated on the display
+    with profiler.phase("draw"):
+      rects = self.scene_manager.current.render()
+      if self.show_profiler or self._overlay_rect is not None:
+        rects = self._draw_overlay(rects)
+
+    with profiler.phase("flip"):
+      if rects is None:
+        pygame.display.flip()
+      elif rects:
+        pygame.display.update(rects)
+    profiler.count("rects", 1 if rects is None else len(rects))
+
+  def _draw_overlay(self, rects):
+    """Draw the profiler summary over the top left corner, or clear it once hidden"""
+    old = self._overlay_rect
+    if old is not None:
+      # the scene draws the area again on the next frame
+      self.screen.fill(color.BLACK, old)
+      self.scene_manager.current.all_sprites.repaint([old])
+      self._overlay_rect = None
+
+    if self.show_profiler:
+      # the summary changes every frame, so its lines would only evict the cached texts
+      font = sprite.text_cache.font(None, 16)
+      lines = [font.render(line, False, color.WHITE) for line in self.profiler.summary(60)]
+      if lines:
+        rect = pygame.Rect(0, 0, max(line.get_width() for line in lines) + 8, sum(line.get_height() for line in lines) + 8)
+        self.screen.fill(color.GRAY, rect)
+        top = 4
+        for line in lines:
+          self.screen.blit(line, (4, top))
+          top += line.get_height()
+        self._overlay_rect = rect
+
+    changed = [rect for rect in (old, self._overlay_rect) if rect is not None]
+    if rects is None or not changed:
+      return rects
+    return list(rects) + changed
+
+  def _step(self):
+    self._update()
+    self.time += self.dt
+    self.steps += 1
+
+  def advance(self, steps=1, *, render=False):
+    """Run steps updates right away, with no clock and no sleeping, for tests and simulations
+
+    Events are handled before every update. With render, the last one is rendered.
+    """
+    for _ in range(steps):
+      self.tasks.apply()
+      self._handle_events()
+      self._step()
+      self.scene_manager.update()
+    self.alpha = 0
+    if render:
+      self._render()
+      self.scene_manager.update()
 
   def run(self):
     self._running = True
+    profiler.active = self.profiler
 
     while (self._running):  # if self.running is false, the game terminates
-      self._main_clock.tick(self._fps)  # FPS control
-
-      self._handle_events()
-
-      self._update()
+      if self.profiler is not None:
+        self.profiler.begin_frame()
+
+      with profiler.phase("tick"):
+        elapsed = self._main_clock.tick(self._fps) / 1000  # FPS control
+
+      with profiler.phase("tasks"):
+        self.tasks.apply()
+
+      with profiler.phase("events"):
+        self._handle_events()
+
+      with profiler.phase("update"):
+        if self.ups is None:
+          self.dt = elapsed
+          self._step()
+        else:
+          self._lag += elapsed
+          steps = 0
+          while self._lag >= self.dt and steps < self.max_steps:
+            self._step()
+            self.scene_manager.update()
+            self._lag -= self.dt
+            steps += 1
+          if self._lag >= self.dt:
+            # too far behind to catch up, let the logic slow down instead of spiralling
+            self._lag %= self.dt
+          self.alpha = self._lag / self.dt
 
       self._render()
 
       self.scene_manager.update()
 
+      if self.profiler is not None:
+        self.profiler.end_frame()
+
+    profiler.active = None
+    self.tasks.shutdown()
     pygame.quit()
 
 
@@ -0,0 +1,146 @@
+import collections, contextlib, csv, json, time
+
+# the FrameProfiler of the running Game, if it profiles
+active = None
+
+_NO_PHASE = contextlib.nullcontext()
+
+
+def phase(name):
+  """Time the with block as the phase name of the active profiler, if there is one"""
+  return _NO_PHASE if active is None else active.phase(name)
+
+
+def count(name, n=1):
+  """Add n to the counter name of the current frame of the active profiler"""
+  if active is not None:
+    active.count(name, n)
+
+
+class Frame:
+  __slots__ = ("index", "start", "end", "events", "counters")
+
+  def __init__(self, index, start):
+    self.index = index
+    self.start = start
+    self.end = start
+    self.events = list()  # (phase, start, seconds)
+    self.counters = collections.Counter()
+
+  @property
+  def seconds(self):
+    return self.end - self.start
+
+  def phases(self):
+    """Return the total seconds of every phase in this frame"""
+    totals = collections.Counter()
+    for name, _, seconds in self.events:
+      totals[name] += seconds
+    return totals
+
+
+class FrameProfiler:
+  """Phase timings and counters of the last size frames
+
+  Frames are kept in a ring buffer, so profiling can stay on in production.
+  A phase nested in a phase of the same name, like a Composite inside a
+  Composite, is timed only once.
+  """
+  def __init__(self, size=600):
+    self.frames = collections.deque(maxlen=size)
+    self._index = 0
+    self._current = None
+    self._open = collections.Counter()  # phases being timed
+
+  def begin_frame(self):
+    self._current = Frame(self._index, time.perf_counter())
+    self._index += 1
+
+  def end_frame(self):
+    if self._current is not None:
+      self._current.end = time.perf_counter()
+      self.frames.append(self._current)
+      self._current = None
+
+  @contextlib.contextmanager
+  def phase(self, name):
+    if self._current is None or self._open[name]:
+      yield
+      return
+
+    self._open[name] += 1
+    start = time.perf_counter()
+    try:
+      yield
+    finally:
+      self._open[name] -= 1
+      if self._current is not None:
+        self._current.events.append((name, start, time.perf_counter() - start))
+
+  def count(self, name, n=1):
+    if self._current is not None:
+      self._current.counters[name] += n
+
+  @property
+  def last(self):
+    return self.frames[-1] if self.frames else None
+
+  def _columns(self, frames):
+    phases = list()
+    counters = list()
+    for frame in frames:
+      for name, _, _ in frame.events:
+        if name not in phases:
+          phases.append(name)
+      for name in frame.counters:
+        if name not in counters:
+          counters.append(name)
+    return phases, counters
+
+  def dump_csv(self, path):
+    """Write a row per frame with its seconds per phase and its counters"""
+    phases, counters = self._columns(self.frames)
+    with open(path, "w", newline="") as file:
+      writer = csv.writer(file)
+      writer.writerow(["frame", "start", "seconds"] + phases + counters)
+      for frame in self.frames:
+        totals = frame.phases()
+        writer.writerow([frame.index, frame.start, frame.seconds]
+                        + [totals[name] for name in phases] + [frame.counters[name] for name in counters])
+
+  def dump_chrome_trace(self, path):
+    """Write the frames in the Chrome trace event format, for chrome://tracing or Perfetto"""
+    events = list()
+    for frame in self.frames:
+      events.append({"name": "frame", "ph": "X", "pid": 0, "tid": 0,
+                     "ts": frame.start * 1e6, "dur": frame.seconds * 1e6, "args": {"index": frame.index}})
+      for name, start, seconds in frame.events:
+        events.append({"name": name, "ph": "X", "pid": 0, "tid": 0, "ts": start * 1e6, "dur": seconds * 1e6})
+      if frame.counters:
+        events.append({"name": "counters", "ph": "C", "pid": 0, "tid": 0,
+                       "ts": frame.start * 1e6, "args": dict(frame.counters)})
+    with open(path, "w") as file:
+      json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
+
+  def dump(self, path):
+    """Write a CSV if path ends with .csv, a Chrome trace otherwise"""
+    if path.endswith(".csv"):
+      self.dump_csv(path)
+    else:
+      self.dump_chrome_trace(path)
+
+  def summary(self, last=None):
+    """Return lines with the mean and worst milliseconds of every phase over the last frames"""
+    frames = list(self.frames)[-last:] if last else list(self.frames)
+    if not frames:
+      return list()
+    phases, counters = self._columns(frames)
+    totals = [frame.phases() for frame in frames]
+    lines = [f"frame {sum(f.seconds for f in frames) / len(frames) * 1e3:.2f} "
+             f"max {max(f.seconds for f in frames) * 1e3:.2f} ms"]
+    for name in phases:
+      values = [total[name] for total in totals]
+      lines.append(f"{name} {sum(values) / len(values) * 1e3:.2f} max {max(values) * 1e3:.2f} ms")
+    for name in counters:
+      lines.append(f"{name} {frames[-1].counters[name]}")
+    return lines
@@ -1,22 +1,33 @@
 import pygame
-from . import sprite
+from . import sprite, spatial
 
 class Scene:
   def __init__(self, game):
     self.game = game
     
-    # the Group to hold all sprites
+    # the Group to hold all sprites, and the grid to find them by position
     #self.all_sprites = sprite.Group()
-    self.all_sprites = sprite.Group()
+    self.index = spatial.SpatialGrid()
+    self.all_sprites = sprite.Group(index=self.index)
   
+  def enter(self): # called when the scene becomes current. draw everything again over a cleared screen
+    self.game.screen.fill((0, 0, 0))
+    self.all_sprites.repaint([self.game.screen.get_rect()])
+
+  def sprites_at(self, pos): # sprites under pos, the top one first
+    return sorted(self.index.at(pos), key=self.all_sprites.get_layer_of_sprite, reverse=True)
+
+  def toggle_key(self, event): # key of what event toggles, if it does. two toggles of a key in a frame cancel out
+    return None
+
   def handle_events(self, events): # handle unhandled events by Game
     pass
   
   def update(self): # update all the things
     self.all_sprites.update()
   
-  def render(self): # render the scene to self.game.screen. flip is not necessary
-    self.all_sprites.draw(self.game.screen)
+  def render(self): # render the scene to self.game.screen and return the changed rects. flip is not necessary
+    return self.all_sprites.draw(self.game.screen)
 
 
 
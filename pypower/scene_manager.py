@@ -29,8 +29,11 @@ class SceneManager:
       raise RuntimeError("SceneManager is not initialized")
     
     if self.next is not None:
+      changed = self._current is not self._scene_dict[self.next]
       self._current = self._scene_dict[self.next]
       self.next = None
+      if changed:
+        self._current.enter()
 
   @property
   def next(self):
@@ -0,0 +1,76 @@
+import pygame
+
+class SpatialGrid:
+  """Uniform grid of cell_size squares indexing sprites by their rects
+
+  A sprite is listed in every cell its rect touches, so finding the sprites
+  at a point looks at one cell whatever the number of sprites. Sprites tell
+  the grids holding them that their rect changed through Sprite.moved.
+  """
+  def __init__(self, cell_size=64):
+    self.cell_size = cell_size
+    self.bounds = None  # union of every rect ever indexed
+    self._cells = dict()  # (cx, cy) -> set of sprites
+    self._keys = dict()  # sprite -> cells it is listed in
+
+  def __len__(self):
+    return len(self._keys)
+
+  def __contains__(self, spr):
+    return spr in self._keys
+
+  def _cells_of(self, rect):
+    size = self.cell_size
+    # an empty rect still sits in the cell of its topleft
+    return [(cx, cy)
+            for cy in range(rect.top // size, (rect.top + max(rect.height, 1) - 1) // size + 1)
+            for cx in range(rect.left // size, (rect.left + max(rect.width, 1) - 1) // size + 1)]
+
+  def insert(self, spr):
+    if spr in self._keys:
+      return
+    rect = pygame.Rect(spr.rect)
+    keys = self._keys[spr] = self._cells_of(rect)
+    for key in keys:
+      self._cells.setdefault(key, set()).add(spr)
+    self.bounds = rect if self.bounds is None else self.bounds.union(rect)
+
+    indexes = getattr(spr, "_indexes", None)
+    if indexes is not None:
+      indexes.append(self)
+
+  def remove(self, spr):
+    keys = self._keys.pop(spr, None)
+    if keys is None:
+      return
+    for key in keys:
+      cell = self._cells[key]
+      cell.discard(spr)
+      if not cell:
+        del self._cells[key]
+
+    indexes = getattr(spr, "_indexes", None)
+    if indexes is not None and self in indexes:
+      indexes.remove(self)
+
+  def move(self, spr):
+    """List spr again by its current rect"""
+    if spr in self._keys:
+      self.remove(spr)
+      self.insert(spr)
+
+  def at(self, pos):
+    """Return the sprites whose rect collides with pos"""
+    cell = self._cells.get((pos[0] // self.cell_size, pos[1] // self.cell_size), ())
+    return [spr for spr in cell if spr.rect.collidepoint(pos)]
+
+  def query(self, rect):
+    """Return the set of sprites whose rect collides with rect"""
+    rect = pygame.Rect(rect)
+    if self.bounds is None:
+      return set()
+    rect = rect.clip(self.bounds)
+    found = set()
+    for key in self._cells_of(rect):
+      found.update(self._cells.get(key, ()))
+    return {spr for spr in found if spr.rect.colliderect(rect)}
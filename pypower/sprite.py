@@ -1,23 +1,60 @@
-import pygame
+import pygame, collections, threading
 from os import path
-from . import directory, color, utility
+from . import directory, color, utility, profiler
 
 class Sprite(pygame.sprite.DirtySprite):
   def __init__(self, groups=list()):
     super().__init__()
 
+    self._indexes = list()  # SpatialGrids listing this sprite
     self._parents = list(groups)
     for parent in self._parents:
       parent.add(self)
 
   def kill(self):
     for parent in self._parents:
-      parent.set_dirty()
+      if isinstance(parent, Composite):
+        parent._invalidate()
 
     self._parents.clear()
 
+    for index in list(self._indexes):
+      index.remove(self)
+
     super().kill()
+
+  def moved(self):
+    """Tell the SpatialGrids listing this sprite that its rect changed"""
+    for index in list(self._indexes):
+      index.move(self)
+
+  @property
+  def dirty(self):
+    return self._dirty
+
+  @dirty.setter
+  def dirty(self, dirty):
+    # Composites holding this sprite update it on their next update
+    self._dirty = dirty
+    if dirty:
+      for parent in getattr(self, "_parents", ()):
+        if isinstance(parent, Composite):
+          parent._invalidate(self)
   
+  def repaint(self, rects):
+    """Redraw the areas of rects, in this sprite's coordinates, without drawing the whole sprite"""
+    rects = [pygame.Rect(rect).move(self.rect.topleft) for rect in rects]
+    for group in self.groups():
+      if isinstance(group, Group):
+        group.repaint(rects)
+    for parent in self._parents:
+      if isinstance(parent, Composite):
+        parent._invalidate()
+
+  def recycle(self):
+    """Give the surfaces owned by this killed sprite back to surface_pool"""
+    pass
+
   def set_dirty(self, dirty=1, ignore_2 = False):
     """Set self.dirty to dirty
     if already self.dirty is 2, dirty is 1 and ignore_2 is False, than it skips the work"""
@@ -26,9 +63,138 @@ class Sprite(pygame.sprite.DirtySprite):
 
 
 class Group(pygame.sprite.LayeredDirty):
-  pass
+  """LayeredDirty which always draws by dirty rects after the first draw
+
+  LayeredDirty falls back to redrawing everything once a draw is slow,
+  which is when a big group can least afford it.
+  """
+  def __init__(self, *sprites, index=None, **kwargs):
+    self.index = index  # SpatialGrid kept in sync with the members, if any
+    kwargs.setdefault("_time_threshold", float("inf"))
+    super().__init__(*sprites, **kwargs)
+
+  def add_internal(self, spr, layer=None):
+    super().add_internal(spr, layer)
+    if self.index is not None:
+      self.index.insert(spr)
+
+  def remove_internal(self, spr):
+    super().remove_internal(spr)
+    if self.index is not None:
+      self.index.remove(spr)
+
+  def draw(self, surface, bgd=None):
+    if profiler.active is not None:
+      profiler.count("dirty", sum(1 for spr in self._spritelist if spr.dirty))
+    full = not self._use_update
+    rects = super().draw(surface, bgd)
+    if full:
+      # a full draw leaves the dirty flags as they were
+      for spr in self.sprites():
+        if spr.dirty == 1:
+          spr.dirty = 0
+    return rects
+
+  def repaint(self, rects):
+    """Redraw the areas of rects on the next draw, even if no sprite there is dirty"""
+    self.lostsprites.extend(pygame.Rect(rect) for rect in rects)
   
 
+class TextCache:
+  """Process-wide cache of fonts and rendered text for Text
+
+  Fonts are kept per (path, size). Rendered surfaces are kept per
+  (text, path, size, color, antialias), the least recently used dropped
+  beyond max_surfaces. Surfaces are shared, so they must not be drawn on.
+  """
+  def __init__(self, max_surfaces=512):
+    self.max_surfaces = max_surfaces
+    self.font_hits = 0
+    self.font_misses = 0
+    self.surface_hits = 0
+    self.surface_misses = 0
+
+    self._fonts = dict()
+    self._surfaces = collections.OrderedDict()
+
+  def font(self, fontname, size):
+    key = (fontname, size)
+    font = self._fonts.get(key)
+    if font is None:
+      self.font_misses += 1
+      font = self._fonts[key] = pygame.font.Font(fontname, size)
+    else:
+      self.font_hits += 1
+    return font
+
+  def render(self, text, fontname, size, color_, antialias):
+    key = (text, fontname, size, tuple(color_), antialias)
+    image = self._surfaces.get(key)
+    if image is not None:
+      self.surface_hits += 1
+      self._surfaces.move_to_end(key)
+      return image
+
+    self.surface_misses += 1
+    image = self.font(fontname, size).render(text, antialias, color_, color.TRANSPARENT)
+    image.set_colorkey(color.TRANSPARENT)
+    self._surfaces[key] = image
+    if len(self._surfaces) > self.max_surfaces:
+      self._surfaces.popitem(last=False)
+    return image
+
+  def clear(self):
+    self._fonts.clear()
+    self._surfaces.clear()
+
+
+text_cache = TextCache()
+
+
+class SurfacePool:
+  """Surfaces of sprites that are gone, kept for new sprites of the same size and format
+
+  Surfaces are kept per (size, per-pixel alpha), up to max_per_key of each.
+  An acquired surface holds whatever was drawn on it last, with no colorkey
+  and no surface alpha. Every method may be called from any thread.
+  """
+  def __init__(self, max_per_key=2):
+    self.max_per_key = max_per_key
+    self.hits = 0
+    self.misses = 0
+
+    self._surfaces = collections.defaultdict(list)
+    self._lock = threading.Lock()
+
+  @property
+  def hit_rate(self):
+    return self.hits / max(self.hits + self.misses, 1)
+
+  def acquire(self, size, flags=0):
+    with self._lock:
+      surfaces = self._surfaces.get((tuple(size), flags & pygame.SRCALPHA))
+      if surfaces:
+        self.hits += 1
+        return surfaces.pop()
+      self.misses += 1
+    return pygame.Surface(size, flags)
+
+  def release(self, surface):
+    surface.set_colorkey(None)
+    surface.set_alpha(None)
+    with self._lock:
+      surfaces = self._surfaces[(surface.get_size(), surface.get_flags() & pygame.SRCALPHA)]
+      if len(surfaces) < self.max_per_key:
+        surfaces.append(surface)
+
+  def clear(self):
+    with self._lock:
+      self._surfaces.clear()
+
+
+surface_pool = SurfacePool()
+
+
 class Text(Sprite):
   """Base class to render and control Text
   
@@ -39,6 +205,8 @@ class Text(Sprite):
   fontname and size -> _update_font
   text,color and antialias-> _update_image
   pos and alignment -> _update_rect
+
+  Fonts and images come from text_cache, so image is shared and must not be drawn on
   """
   def __init__(self, text, pos, size, *, fontname='arial.ttf', alignment=(-1,-1), color=color.WHITE, layer=0, antialias=False):
     super().__init__()
@@ -63,18 +231,18 @@ class Text(Sprite):
     self._update_font()
 
   def _update_font(self):
-    self._font = pygame.font.Font(self.fontname, self.size)
+    self._font = text_cache.font(self.fontname, self.size)
     self._update_image()
 
   def _update_image(self):
-    self.image = self._font.render(self.text, self.antialias, self.color, color.TRANSPARENT)
-    self.image.set_colorkey(color.TRANSPARENT)
+    self.image = text_cache.render(self.text, self.fontname, self.size, self.color, self.antialias)
     self._update_rect()
   
   def _update_rect(self):
     self.rect = self.image.get_rect()
     utility.move_rect_by_alignment(self.rect, self._pos, self._alignment)
     self.dirty = 1
+    self.moved()
 
   def __repr__(self):
     return f"Text({str(self.rect)}, {self.text})"
@@ -188,6 +356,7 @@ class Image(Sprite):
     self.rect = self.image.get_rect()
     utility.move_rect_by_alignment(self.rect, self._pos, self._alignment)    
     self.dirty = 1
+    self.moved()
 
   @property
   def filename(self):
@@ -236,36 +405,72 @@ class Image(Sprite):
 
 
 class Composite(Sprite):
-  """Sprite which has other Sprites"""
+  """Sprite which has other Sprites
+
+  Only the children changed since the last update are updated and drawn.
+  The areas they cover are repainted by the Groups holding this sprite,
+  so the whole sprite is drawn again only when it is dirty itself.
+  """
   def __init__(self, left, top, width, height):
     super().__init__()
     self.rect = pygame.Rect(left, top, width, height)
-    self.image = pygame.Surface(self.rect.size)
-    self.bgd = self.image.copy()
+    self.image = surface_pool.acquire(self.rect.size)
+    self.bgd = surface_pool.acquire(self.rect.size)
+    self.bgd.fill(color.BLACK)
     self.image.fill(color.TRANSPARENT)
     self.image.set_colorkey(color.TRANSPARENT)
 
     self._children = Group()
     self._clean_len = 0
+    self._changed = set()  # children to update on the next update
+    self._redraw = True  # draw the children group even if no child changed
   
+  def recycle(self):
+    surface_pool.release(self.image)
+    surface_pool.release(self.bgd)
+    self.image = self.bgd = None
+
   def add(self, spr: Sprite):
     self._children.add(spr)
     spr._parents.append(self)
+    if spr.dirty:
+      self._invalidate(spr)
 
   def remove(self, spr):
     self._children.remove(spr)
-    self.set_dirty()
+    self._invalidate()
+
+  @property
+  def pending(self):
+    """Whether the next update has work to do"""
+    return self._redraw or bool(self._changed)
+
+  def _invalidate(self, spr=None):
+    """Schedule spr, or only the drawing of the children, for the next update"""
+    if spr is None:
+      self._redraw = True
+    else:
+      self._changed.add(spr)
+    for parent in self._parents:
+      if isinstance(parent, Composite):
+        parent._invalidate(self)
 
   def update(self):
     super().update()
 
-    # Update all sprites
-    # If there are any changes, set itself dirty
-    for spr in self._children:
-      spr.update()
-      if spr.dirty != 0:
-        self.set_dirty()
-    
-    self._children.draw(self.image, bgd=self.bgd)
-  
-  
+    if not self.pending:
+      return
+
+    with profiler.phase("composite"):
+      changed = self._changed
+      self._changed = set()
+      self._redraw = False
+      for spr in changed:
+        spr.update()
+        # animated children have to be updated on every frame
+        if spr.dirty == 2 or (isinstance(spr, Composite) and spr.pending):
+          self._changed.add(spr)
+      
+      rects = self._children.draw(self.image, self.bgd)
+      if not self.dirty:
+        self.repaint(rects)
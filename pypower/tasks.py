@@ -0,0 +1,43 @@
+import concurrent.futures, queue
+
+class TaskQueue:
+  """Runs expensive work on worker threads and hands the results back to the game loop
+
+  submit returns at once. The callback of a task gets its result on the main
+  thread when apply is called, which Game does at the start of every frame,
+  so scenes never see their state change in the middle of a frame.
+  An exception raised by a task is raised again by apply.
+  """
+  def __init__(self, workers=1):
+    self.workers = workers
+    self._executor = None  # started on the first submit
+    self._done = queue.SimpleQueue()  # (future, callback) of finished tasks
+    self.pending = 0
+
+  def submit(self, function, *args, callback=None, **kwargs):
+    if self._executor is None:
+      self._executor = concurrent.futures.ThreadPoolExecutor(self.workers, thread_name_prefix="pypower-task")
+    self.pending += 1
+    future = self._executor.submit(function, *args, **kwargs)
+    future.add_done_callback(lambda future: self._done.put((future, callback)))
+    return future
+
+  def apply(self):
+    """Call the callbacks of the finished tasks and return how many there were"""
+    count = 0
+    while True:
+      try:
+        future, callback = self._done.get_nowait()
+      except queue.Empty:
+        return count
+      self.pending -= 1
+      count += 1
+      result = future.result()
+      if callback is not None:
+        callback(result)
+
+  def shutdown(self):
+    """Wait for the running tasks, dropping their results"""
+    if self._executor is not None:
+      self._executor.shutdown(wait=True, cancel_futures=True)
+      self._executor = None
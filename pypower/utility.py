@@ -1,6 +1,7 @@
 import pygame
 import math
-from . import direction
+from . import spatial
+from .direction import UP, DOWN, LEFT, RIGHT
 
 def move_rect_by_alignment(rect, pos, alignment):
   if alignment[0] == -1:
@@ -22,106 +23,128 @@ def move_rect_by_alignment(rect, pos, alignment):
     raise ValueError("alignment must be a tuple of -1, 0, or 1 whose length is 2 like (-1, 0), (1, -1), or (1, 1)")
 
     
-#################################### Not completed
 class DirectionFinder:
-  def __init__(self):
-    self._sprites = pygame.sprite.LayeredDirty()
+  """Finds the sprite next to another one in a direction, like focus moving between buttons
+
+  Lookups go through a SpatialGrid, the one of a Scene if given, searching
+  bands of grid cells outwards from the fiducial sprite until no farther
+  sprite can be closer.
+  """
+  def __init__(self, index=None):
+    self._index = index if index is not None else spatial.SpatialGrid()
+    self._own_index = index is None
+    self._sprites = set()
 
   def add(self, sprite):
     if sprite in self._sprites:
       raise ValueError("The sprite is already in this DirectionFinder")
     else:
       self._sprites.add(sprite)
+      if self._own_index:
+        self._index.insert(sprite)
 
   def remove(self, sprite):
     if not (sprite in self._sprites):
       raise ValueError("The sprite is not in this DirectionFinder")
     else:
       self._sprites.remove(sprite)
+      if self._own_index:
+        self._index.remove(sprite)
 
   def find(self, fiducial_sprite: pygame.sprite.DirtySprite, direction, fiducial_angle=5):
     """Find and return the sprite which is just next to fiducial_sprite"""
     if fiducial_angle < 0:
       raise ValueError("fiducial angle must be positive")
-
-    candidates = list()
-
-    get_pos1 = None
-    get_pos2 = None
-
-    if direction == direction.UP:
-      get_pos1 = lambda sprite: sprite.rect.midleft
-      get_pos2 = lambda sprite: sprite.rect.midright
-    elif direction == direction.DOWN:
-      get_pos1 = lambda sprite: sprite.rect.midright
-      get_pos2 = lambda sprite: sprite.rect.midleft
-    elif direction == direction.LEFT:
-      get_pos1 = lambda sprite: sprite.rect.midbottom
-      get_pos2 = lambda sprite: sprite.rect.midtop
-    elif direction == direction.RIGHT:
-      get_pos1 = lambda sprite: sprite.rect.midtop
-      get_pos2 = lambda sprite: sprite.rect.midbottom
-    else:
+    if direction not in (UP, DOWN, LEFT, RIGHT):
       raise ValueError("direction must be UP, DOWN, LEFT or RIGHT in definition.py")
 
-    a1 = get_pos1(fiducial_sprite)
-    a2 = get_pos2(fiducial_sprite)
-
-    print("a1 and a2: ", a1, a2)  ######################
-
-    for sprite in self._sprites:
-      print("testing sprite: ", sprite)  ###############
-      print("direction: ", direction)  ###############
-      if direction == direction.UP and fiducial_sprite.rect.centery <= sprite.rect.centery:
-        print("continued")  #######################
-        continue
-      elif direction == direction.DOWN and fiducial_sprite.rect.centery >= sprite.rect.centery:
-        print("continued", fiducial_sprite.rect.centery, sprite.rect.centery)  #######################
-        continue
-      elif direction == direction.LEFT and fiducial_sprite.rect.centerx <= sprite.rect.centerx:
-        print("continued")  #######################
-        continue
-      elif direction == direction.RIGHT and fiducial_sprite.rect.centerx >= sprite.rect.centerx:
-        print("continued")  #######################
-        continue
-
-      x1 = get_pos1(sprite)
-      x2 = get_pos2(sprite)
-
-      angle21 = find_angle(find_vector(a2, x1))
-      angle12 = find_angle(find_vector(a1, x2))
-      base_angle = find_angle(direction)
-
-      flag1 = False
-      flag2 = False
-
-      if direction == direction.LEFT:  ############################
-        flag1 = angle12 >= base_angle - fiducial_angle or angle12 < -90
-        flag2 = angle21 <= -base_angle + fiducial_angle or angle21 > 90
-      else:
-        flag1 = angle12 >= base_angle - fiducial_angle
-        flag2 = angle21 <= base_angle + fiducial_angle
+    bounds = self._index.bounds
+    if bounds is None:
+      return fiducial_sprite
 
-      if flag1 and flag2:
-        candidates.append(sprite)
-        print("appended")  ##################
+    fiducial = fiducial_sprite.rect
+    axis = 0 if direction[0] else 1  # the axis to move along
+    sign = direction[axis]
+    # a sprite at distance d along the axis is in sight only if it overlaps
+    # the fiducial sprite widened by d*spread across the axis
+    spread = math.tan(math.radians(fiducial_angle)) if fiducial_angle < 90 else math.inf
+    step = self._index.cell_size
+    start = fiducial.center[axis]
+    limit = (bounds.right if axis == 0 else bounds.bottom) - start if sign > 0 else start - (bounds.left if axis == 0 else bounds.top)
+
+    best = None
+    best_score = math.inf
+    seen = set()
+    distance = 0
+    while distance < limit and best_score > distance:
+      near = distance
+      distance += step
+      # the band of sprites whose centers are near to distance away, and the width they may be seen in
+      width = distance*spread
+      low = (fiducial.top if axis == 0 else fiducial.left) - width
+      high = (fiducial.bottom if axis == 0 else fiducial.right) + width
+      low = max(low, bounds.top if axis == 0 else bounds.left)
+      high = min(high, bounds.bottom if axis == 0 else bounds.right)
+      band = (start + near, start + distance) if sign > 0 else (start - distance, start - near)
+      if axis == 0:
+        area = pygame.Rect(band[0], low, band[1] - band[0] + 1, high - low + 1)
       else:
-        print("passed")  #############
-
-    print("candidates: ", candidates) ######
-
-    if candidates:
-      if direction == direction.UP:
-        return max(candidates, key=lambda sprite: (sprite.rect.centery - abs(sprite.rect.centerx - fiducial_sprite.rect.centerx)))
-      elif direction == direction.DOWN:
-        return min(candidates, key=lambda sprite: (sprite.rect.centery + abs(sprite.rect.centerx - fiducial_sprite.rect.centerx)))
-      elif direction == direction.LEFT:
-        return max(candidates, key=lambda sprite: (sprite.rect.centerx - abs(sprite.rect.centery - fiducial_sprite.rect.centery)))
-      elif direction == direction.RIGHT:
-        return min(candidates, key=lambda sprite: (sprite.rect.centerx + abs(sprite.rect.centery - fiducial_sprite.rect.centery)))
-    else:
-      print("fiducial_sprite is returned")  #########################
-      return fiducial_sprite
+        area = pygame.Rect(low, band[0], high - low + 1, band[1] - band[0] + 1)
+
+      for sprite in self._index.query(area):
+        if sprite in seen or sprite not in self._sprites or sprite is fiducial_sprite:
+          continue
+        seen.add(sprite)
+        if not in_sight(fiducial_sprite, sprite, direction, fiducial_angle):
+          continue
+        # nearer along the direction first, then nearer across it
+        score = sign*(sprite.rect.center[axis] - start) + abs(sprite.rect.center[1-axis] - fiducial.center[1-axis])
+        if score < best_score:
+          best = sprite
+          best_score = score
+
+    return best if best is not None else fiducial_sprite
+
+
+def in_sight(fiducial_sprite, sprite, direction, fiducial_angle):
+  """Return whether sprite lies in direction of fiducial_sprite within fiducial_angle degrees"""
+  if direction == UP:
+    get_pos1 = lambda sprite: sprite.rect.midleft
+    get_pos2 = lambda sprite: sprite.rect.midright
+    if fiducial_sprite.rect.centery <= sprite.rect.centery:
+      return False
+  elif direction == DOWN:
+    get_pos1 = lambda sprite: sprite.rect.midright
+    get_pos2 = lambda sprite: sprite.rect.midleft
+    if fiducial_sprite.rect.centery >= sprite.rect.centery:
+      return False
+  elif direction == LEFT:
+    get_pos1 = lambda sprite: sprite.rect.midbottom
+    get_pos2 = lambda sprite: sprite.rect.midtop
+    if fiducial_sprite.rect.centerx <= sprite.rect.centerx:
+      return False
+  else:
+    get_pos1 = lambda sprite: sprite.rect.midtop
+    get_pos2 = lambda sprite: sprite.rect.midbottom
+    if fiducial_sprite.rect.centerx >= sprite.rect.centerx:
+      return False
+
+  a1 = get_pos1(fiducial_sprite)
+  a2 = get_pos2(fiducial_sprite)
+  x1 = get_pos1(sprite)
+  x2 = get_pos2(sprite)
+
+  angle21 = find_angle(find_vector(a2, x1))
+  angle12 = find_angle(find_vector(a1, x2))
+  base_angle = find_angle(direction)
+
+  if direction == LEFT:  # the base angle is 180, where atan2 wraps around
+    flag1 = angle12 >= base_angle - fiducial_angle or angle12 < -90
+    flag2 = angle21 <= -base_angle + fiducial_angle or angle21 > 90
+  else:
+    flag1 = angle12 >= base_angle - fiducial_angle
+    flag2 = angle21 <= base_angle + fiducial_angle
+  return flag1 and flag2
 
 
 def find_vector(point1, point2):
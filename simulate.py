@@ -0,0 +1,127 @@
+"""Play seeded games headless on every core and stream the results
+
+usage: python simulate.py GAMES [--width X] [--height Y] [--mines N] [--seed S]
+                          [--player module:Class] [--workers W] [--chunk C] [--out results.jsonl|results.csv]
+
+A player is any class built with a mines.board.BoardCore whose play() returns
+whether the game is won. If it has a stats attribute like mines.solver.Solver,
+its move counts are recorded as well.
+"""
+import argparse, concurrent.futures, csv, importlib, json, os, sys, time
+from mines import board
+
+FIELDS = ("seed", "width", "height", "mines", "won", "moves", "guesses", "seconds")
+
+
+def load_player(spec):
+  """Return the class named by "module:Class" """
+  module_name, _, class_name = spec.partition(":")
+  return getattr(importlib.import_module(module_name), class_name)
+
+
+def play_game(player, x, y, n, seed):
+  start = time.perf_counter()
+  game = player(board.BoardCore(x, y, n, seed=seed))
+  won = game.play()
+  stats = getattr(game, "stats", None)
+  return {
+    "seed": seed, "width": x, "height": y, "mines": n, "won": bool(won),
+    "moves": stats.moves if stats else None,
+    "guesses": stats.guesses if stats else None,
+    "seconds": time.perf_counter() - start,
+  }
+
+
+def play_chunk(player_spec, x, y, n, seeds):
+  """Play a game for every seed; this runs in the worker processes"""
+  player = load_player(player_spec)
+  return [play_game(player, x, y, n, seed) for seed in seeds]
+
+
+class JSONLSink:
+  def __init__(self, file):
+    self._file = file
+
+  def write(self, row):
+    self._file.write(json.dumps(row) + "\n")
+
+
+class CSVSink:
+  def __init__(self, file):
+    self._writer = csv.DictWriter(file, FIELDS)
+    self._writer.writeheader()
+
+  def write(self, row):
+    self._writer.writerow(row)
+
+
+def make_sink(file, path):
+  return CSVSink(file) if path.endswith(".csv") else JSONLSink(file)
+
+
+def simulate(games, x, y, n, sink, *, player="mines.solver:Solver", seed=0, workers=None, chunk=64):
+  """Play games seeded seed, seed+1, ... and write a row per game to sink as chunks complete
+
+  workers=0 plays in this process. Otherwise at most a few chunks per worker are
+  in flight, so memory does not grow with the number of games.
+  Return the number of games won.
+  """
+  end = seed + games
+  starts = iter(range(seed, end, chunk))
+  wins = 0
+
+  if workers == 0:
+    for start in starts:
+      for row in play_chunk(player, x, y, n, range(start, min(start + chunk, end))):
+        wins += row["won"]
+        sink.write(row)
+    return wins
+
+  with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+    pending = set()
+    limit = 4*(workers or os.cpu_count() or 1)
+    while True:
+      for start in starts:
+        pending.add(executor.submit(play_chunk, player, x, y, n, range(start, min(start + chunk, end))))
+        if len(pending) >= limit:
+          break
+      if not pending:
+        break
+
+      done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+      for future in done:
+        for row in future.result():
+          wins += row["won"]
+          sink.write(row)
+  return wins
+
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument("games", type=int)
+  parser.add_argument("--width", type=int, default=30)
+  parser.add_argument("--height", type=int, default=16)
+  parser.add_argument("--mines", type=int, default=99)
+  parser.add_argument("--seed", type=int, default=0)
+  parser.add_argument("--player", default="mines.solver:Solver")
+  parser.add_argument("--workers", type=int, default=None, help="default: one per core, 0 to play in this process")
+  parser.add_argument("--chunk", type=int, default=64, help="games per task sent to a worker")
+  parser.add_argument("--out", default="-", help="JSONL or .csv file, - for stdout")
+  args = parser.parse_args(argv)
+
+  file = sys.stdout if args.out == "-" else open(args.out, "w", newline="")
+  start = time.perf_counter()
+  try:
+    wins = simulate(args.games, args.width, args.height, args.mines, make_sink(file, args.out),
+                    player=args.player, seed=args.seed, workers=args.workers, chunk=args.chunk)
+  finally:
+    if file is not sys.stdout:
+      file.close()
+
+  seconds = time.perf_counter() - start
+  print(f"{args.games} games, {wins} won ({wins / max(args.games, 1):.3f}) in {seconds:.2f}s "
+        f"({args.games / seconds:.1f} games/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,62 @@
+import random
+from mines import board
+
+
+def reference_fill(core, flat):
+  """Return the cells opening flat would open, by a plain flood fill over zero cells"""
+  seen = {flat}
+  stack = [flat]
+  while stack:
+    cell = stack.pop()
+    if core.numbers[cell] or core.mines[cell]:
+      continue
+    for nb in core.neighbours(cell):
+      if nb not in seen and not core.opened[nb] and not core.flaged[nb]:
+        seen.add(nb)
+        stack.append(nb)
+  return seen
+
+
+def numbers_next_to_zeros(core):
+  """Yield (numbered cell, zero cell next to it) for every such closed pair"""
+  for flat in range(len(core.mines)):
+    if core.opened[flat] or core.mines[flat] or not core.numbers[flat]:
+      continue
+    for nb in core.neighbours(flat):
+      if not core.opened[nb] and not core.mines[nb] and not core.numbers[nb]:
+        yield flat, nb
+
+
+def test_unflagged_number_blocks_fill():
+  for seed in range(20):
+    core = board.BoardCore(9, 9, 10, seed=seed)
+    core.init((0, 0))
+    for number, zero in list(numbers_next_to_zeros(core)):
+      core = board.BoardCore(9, 9, 10, seed=seed)
+      core.init((0, 0))
+      core.toggle_flag(core.to_index(number))
+      core.toggle_flag(core.to_index(number))
+
+      expected = reference_fill(core, zero)
+      assert set(core.open(core.to_index(zero))) == expected
+      assert not core.game_over
+      assert core.safe_opened == len(expected)
+
+
+def test_random_flags_match_reference_fill():
+  rng = random.Random(0)
+  for seed in range(200):
+    core = board.BoardCore(16, 16, 40, seed=seed)
+    core.init((8, 8))
+    size = len(core.mines)
+    for _ in range(30):
+      flat = rng.randrange(size)
+      if rng.random() < 0.5:
+        core.toggle_flag(core.to_index(flat))
+        continue
+      if core.opened[flat] or core.flaged[flat] or core.mines[flat]:
+        continue
+      expected = reference_fill(core, flat)
+      assert set(core.open(core.to_index(flat))) == expected
+      assert core.safe_opened == sum(1 for cell in range(size) if core.opened[cell] and not core.mines[cell])
+      assert not core.game_over
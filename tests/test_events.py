@@ -0,0 +1,47 @@
+import pygame
+from pypower import events
+
+
+def flag_key(event):
+  if event.type == pygame.MOUSEBUTTONDOWN and event.button == 3:
+    return ("flag", (event.pos[0] // 32, event.pos[1] // 32))
+  elif event.type == pygame.KEYDOWN and event.key == pygame.K_n:
+    return ("no_guess",)
+  return None
+
+
+def click(button, pos):
+  return [pygame.event.Event(pygame.MOUSEBUTTONDOWN, button=button, pos=pos),
+          pygame.event.Event(pygame.MOUSEBUTTONUP, button=button, pos=pos)]
+
+
+def press(key):
+  return [pygame.event.Event(pygame.KEYDOWN, key=key), pygame.event.Event(pygame.KEYUP, key=key)]
+
+
+def test_double_right_click_cancels_with_releases():
+  assert events.coalesce(click(3, (40, 40)) + click(3, (41, 40)), flag_key) == []
+
+
+def test_triple_right_click_keeps_one_click():
+  stream = click(3, (40, 40)) + click(3, (40, 40)) + click(3, (40, 40))
+  assert events.coalesce(stream, flag_key) == stream[4:]
+
+
+def test_double_key_press_cancels():
+  assert events.coalesce(press(pygame.K_n) + press(pygame.K_n), flag_key) == []
+
+
+def test_motion_between_clicks_is_kept():
+  motion = pygame.event.Event(pygame.MOUSEMOTION, pos=(41, 40), rel=(1, 0), buttons=(0, 0, 0))
+  assert events.coalesce(click(3, (40, 40)) + [motion] + click(3, (41, 40)), flag_key) == [motion]
+
+
+def test_other_event_between_clicks_keeps_both():
+  stream = click(3, (40, 40)) + click(1, (100, 100)) + click(3, (40, 40))
+  assert events.coalesce(stream, flag_key) == stream
+
+
+def test_different_cells_are_kept():
+  stream = click(3, (40, 40)) + click(3, (80, 40))
+  assert events.coalesce(stream, flag_key) == stream